@@ -0,0 +1,129 @@
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from postgrest.exceptions import APIError
+
+import metricas
+from conexao import obter_cliente
+from estado import CHAVE_REFACAO
+from repositorio import filtro_keyset
+
+
+TTL_ANALISE = 300
+TAMANHO_PAGINA = 1000
+VALOR_VAZIO = "(vazio)"
+CODIGOS_FUNCAO_AUSENTE = ("PGRST202", 404)
+
+DIMENSOES = {
+    "motivo_refacao": "Motivo",
+    "cliente_solicitou_refacao": "Cliente que solicitou",
+    "time_solicitou_refacao": "Time que solicitou",
+    "time_responsavel": "Time responsável",
+    "tipo_refacao": "Tipo",
+}
+GRANULARIDADES = {"day": "Dia", "week": "Semana", "month": "Mês"}
+PERIODOS_PANDAS = {"week": "W-SUN", "month": "M"}
+
+ESQUEMA_RESUMO = pa.schema([
+    ("periodo", pa.timestamp("us", tz="UTC")),
+    ("valor", pa.string()),
+    ("total", pa.int64()),
+])
+
+
+def _limites(inicio, fim):
+    inicio_iso = inicio.isoformat() if inicio else None
+    fim_iso = (fim + datetime.timedelta(days=1)).isoformat() if fim else None
+    return inicio_iso, fim_iso
+
+
+def _para_dataframe(linhas):
+    for linha in linhas:
+        linha["periodo"] = pd.Timestamp(linha["periodo"]).tz_convert("UTC")
+    tabela = pa.Table.from_pylist(linhas, schema=ESQUEMA_RESUMO)
+    return tabela.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _resumo_servidor(dimensao, inicio, fim, granularidade):
+    inicio_iso, fim_iso = _limites(inicio, fim)
+    response = metricas.executar(obter_cliente().rpc("resumo_refacoes", {
+        "dimensao": dimensao,
+        "inicio": inicio_iso,
+        "fim": fim_iso,
+        "granularidade": granularidade,
+    }), "resumo_refacoes")
+    return _para_dataframe(response.data or [])
+
+
+def _paginas_refacoes(colunas, inicio, fim):
+    inicio_iso, fim_iso = _limites(inicio, fim)
+    ultima_linha = None
+    while True:
+        consulta = obter_cliente().table("cards_refacao").select(",".join(CHAVE_REFACAO + tuple(colunas)))
+        if inicio_iso:
+            consulta = consulta.gte("created_at", inicio_iso)
+        if fim_iso:
+            consulta = consulta.lt("created_at", fim_iso)
+        if ultima_linha is not None:
+            consulta = consulta.or_(filtro_keyset(ultima_linha))
+        response = metricas.executar(
+            consulta
+            .order("id_trello_card").order("numero_conteudo").order("numero_refacao")
+            .limit(TAMANHO_PAGINA),
+            "paginas_refacoes"
+        )
+        if not response.data:
+            return
+        yield response.data
+        if len(response.data) < TAMANHO_PAGINA:
+            return
+        ultima_linha = response.data[-1]
+
+
+def _contar_pagina(linhas, dimensao, granularidade):
+    df = pd.DataFrame(linhas, columns=["created_at", dimensao])
+    criado_em = pd.to_datetime(df["created_at"], utc=True, format="ISO8601")
+    if granularidade == "day":
+        periodo = criado_em.dt.floor("D")
+    else:
+        periodo = criado_em.dt.tz_localize(None).dt.to_period(PERIODOS_PANDAS[granularidade]).dt.start_time.dt.tz_localize("UTC")
+
+    valor = df[dimensao].astype("string").str.strip().replace("", pd.NA).fillna(VALOR_VAZIO)
+    return pd.DataFrame({"periodo": periodo, "valor": valor}).groupby(["periodo", "valor"]).size()
+
+
+def _resumo_local(dimensao, inicio, fim, granularidade):
+    contagens = None
+    for linhas in _paginas_refacoes(["created_at", dimensao], inicio, fim):
+        pagina = _contar_pagina(linhas, dimensao, granularidade)
+        contagens = pagina if contagens is None else contagens.add(pagina, fill_value=0)
+    if contagens is None:
+        return _para_dataframe([])
+
+    resumo = contagens.astype("int64").sort_index().rename("total").reset_index()
+    tabela = pa.Table.from_pandas(resumo, schema=ESQUEMA_RESUMO, preserve_index=False)
+    return tabela.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+@st.cache_data(ttl=TTL_ANALISE, show_spinner="Calculando resumo...")
+def resumo_refacoes(dimensao, inicio=None, fim=None, granularidade="month"):
+    if dimensao not in DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimensao}")
+    try:
+        return _resumo_servidor(dimensao, inicio, fim, granularidade)
+    except APIError as e:
+        if e.code not in CODIGOS_FUNCAO_AUSENTE:
+            raise
+        return _resumo_local(dimensao, inicio, fim, granularidade)
+
+
+def totais_por_valor(resumo):
+    return resumo.groupby("valor", sort=False)["total"].sum().sort_values(ascending=False)
+
+
+def tendencia(resumo, max_series=8):
+    principais = totais_por_valor(resumo).index[:max_series]
+    filtrado = resumo[resumo["valor"].isin(principais)]
+    return filtrado.pivot_table(index="periodo", columns="valor", values="total", aggfunc="sum", fill_value=0)
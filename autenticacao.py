@@ -0,0 +1,21 @@
+import streamlit as st
+
+
+def check_password():
+    if "password_correct" not in st.session_state:
+        st.session_state.password_correct = False
+
+    if not st.session_state.password_correct:
+        st.markdown("### 🔒")
+        password = st.text_input("Digite a senha:", type="password")
+
+        if password == st.secrets["general"]["password"]:
+            st.session_state.password_correct = True
+            st.rerun()
+        elif password:
+            st.error("Senha incorreta")
+            st.stop()
+        else:
+            st.stop()
+
+    return True
@@ -0,0 +1,175 @@
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+os.environ.setdefault("SUPABASE_REPOSITORIO", "sqlite")
+os.environ.setdefault("SUPABASE_TEMPO_REAL", "0")
+
+from streamlit.testing.v1 import AppTest
+
+import repositorio
+from catalogo import ARQUIVO_CATALOGO
+from repositorio import RepositorioSQLite
+
+
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+TIMEOUT_RERUN = 60
+
+
+class RepositorioContador:
+    def __init__(self, repositorio_real):
+        self._repositorio = repositorio_real
+        self.consultas = Counter()
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._repositorio, nome)
+        if not callable(atributo):
+            return atributo
+
+        def chamada(*args, **kwargs):
+            self.consultas[nome] += 1
+            return atributo(*args, **kwargs)
+        return chamada
+
+
+def popular(repo, cards, conteudos, refacoes, semente=0):
+    aleatorio = random.Random(semente)
+    with open(ARQUIVO_CATALOGO, encoding="utf-8") as arquivo:
+        catalogo = json.load(arquivo)
+
+    repo.inserir_cards([{"trello_card_id": f"card-{i}", "titulo": f"Card {i:05d}"} for i in range(cards)])
+    for i in range(cards):
+        linhas = []
+        for cont_num in range(1, conteudos + 1):
+            for ref_num in range(1, refacoes + 1):
+                tipo = aleatorio.choice(("Interna", "Externa"))
+                linhas.append({
+                    "id_trello_card": f"card-{i}",
+                    "titulo": f"Card {i:05d}",
+                    "numero_conteudo": cont_num,
+                    "numero_refacao": ref_num,
+                    "tipo_refacao": tipo,
+                    "motivo_refacao": aleatorio.choice(catalogo["motivo_criacao"]),
+                    "time_solicitou_refacao": aleatorio.choice(catalogo["time"]) if tipo == "Interna" else None,
+                    "cliente_solicitou_refacao": aleatorio.choice(catalogo["cliente"]) if tipo == "Externa" else None,
+                    "time_responsavel": "Criação",
+                })
+        repo.salvar_refacoes(linhas)
+
+
+def interacoes(refacoes):
+    card = "card-0"
+    return [
+        ("primeira_carga", lambda at: at),
+        ("abrir_card", lambda at: at.text_input(key="nome_card_selecionado").input("Card 00000")),
+        ("trocar_conteudo", lambda at: at.slider(key=f"slider-conteudo-{card}").set_value(2)),
+        ("editar_motivo", lambda at: at.selectbox(key=f"motivo-{card}-2-1").select("Briefing incompleto")),
+        ("adicionar_refacao", lambda at: at.button(key=f"ADD_GLOBAL_{card}_2").click()),
+        ("salvar", lambda at: at.button(key=f"salvar-{card}").click()),
+        ("excluir_refacao", lambda at: at.button(key=f"DELETE_GLOBAL-{card}-2-{refacoes + 1}").click()),
+        ("abrir_outro_card", lambda at: at.text_input(key="nome_card_selecionado").input("Card 00001")),
+    ]
+
+
+def executar_cenario(contador, refacoes, com_memoria=False):
+    at = AppTest.from_file(SCRIPT, default_timeout=TIMEOUT_RERUN)
+    at.secrets["general"] = {"password": "benchmark"}
+    at.session_state["password_correct"] = True
+
+    resultados = {}
+    for nome, acao in interacoes(refacoes):
+        contador.consultas.clear()
+        elemento = acao(at)
+        if com_memoria:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        elemento.run()
+        duracao = time.perf_counter() - inicio
+        if at.exception:
+            raise RuntimeError(f"{nome}: {at.exception[0].message}")
+
+        resultados[nome] = {"latencia_ms": duracao * 1000, "consultas": sum(contador.consultas.values())}
+        if com_memoria:
+            resultados[nome]["pico_memoria_kib"] = (tracemalloc.get_traced_memory()[1] - base) / 1024
+    return resultados
+
+
+def medir(cards, conteudos, refacoes, repeticoes):
+    contador = RepositorioContador(RepositorioSQLite())
+    popular(contador._repositorio, cards, conteudos, refacoes)
+    repositorio._repositorio = contador
+
+    execucoes = [executar_cenario(contador, refacoes) for _ in range(repeticoes)]
+
+    tracemalloc.start()
+    try:
+        memoria = executar_cenario(contador, refacoes, com_memoria=True)
+    finally:
+        tracemalloc.stop()
+
+    relatorio = {}
+    for nome in execucoes[0]:
+        relatorio[nome] = {
+            "latencia_ms": statistics.median(e[nome]["latencia_ms"] for e in execucoes),
+            "consultas": max(e[nome]["consultas"] for e in execucoes),
+            "pico_memoria_kib": memoria[nome]["pico_memoria_kib"],
+        }
+    return relatorio
+
+
+def comparar(relatorio, base, tolerancia):
+    regressoes = []
+    for nome, atual in relatorio.items():
+        anterior = base.get(nome)
+        if anterior is None:
+            continue
+        if atual["consultas"] > anterior["consultas"]:
+            regressoes.append(f"{nome}: consultas {anterior['consultas']} -> {atual['consultas']}")
+        for metrica in ("latencia_ms", "pico_memoria_kib"):
+            if atual[metrica] > anterior[metrica] * (1 + tolerancia):
+                regressoes.append(f"{nome}: {metrica} {anterior[metrica]:.1f} -> {atual[metrica]:.1f}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede a latência de rerun do app com um banco SQLite sintético.")
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--conteudos", type=int, default=20)
+    parser.add_argument("--refacoes", type=int, default=12)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="Grava o relatório em JSON.")
+    parser.add_argument("--comparar", help="Relatório JSON de referência para detectar regressões.")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    relatorio = medir(args.cards, args.conteudos, args.refacoes, args.repeticoes)
+
+    print(f"{'interação':<20} {'latência (ms)':>14} {'consultas':>10} {'pico (KiB)':>12}")
+    for nome, medidas in relatorio.items():
+        print(f"{nome:<20} {medidas['latencia_ms']:>14.1f} {medidas['consultas']:>10} {medidas['pico_memoria_kib']:>12.1f}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(relatorio, json.load(arquivo), args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}", file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import time
+
+import streamlit as st
+
+import metricas
+from conexao import obter_cliente
+from repositorio import tipo_repositorio
+
+
+TTL_CATALOGO = 3600
+ESPERA_CATALOGO_FALHA = 60
+ARQUIVO_CATALOGO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogo.json")
+OPCAO_VAZIA = " "
+CATEGORIAS = ("tipo", "time", "cliente", "motivo_criacao", "motivo_redacao")
+
+logger = logging.getLogger("refacao.catalogo")
+_falha_banco = None
+
+
+class Opcoes:
+    __slots__ = ("valores", "indices", "descricoes")
+
+    def __init__(self, valores, descricoes=None):
+        self.valores = (OPCAO_VAZIA, *valores)
+        self.indices = {valor: i for i, valor in enumerate(self.valores)}
+        self.descricoes = descricoes or {}
+
+    def __contains__(self, valor):
+        return valor in self.indices
+
+    def indice(self, valor):
+        return self.indices.get(valor, 0)
+
+    def com_valor(self, valor):
+        if not valor or valor in self.indices:
+            return self.valores
+        return self.valores + (valor,)
+
+    def ajuda(self):
+        if not self.descricoes:
+            return None
+        return "\n".join(f"- **{valor}**: {descricao}" for valor, descricao in self.descricoes.items())
+
+
+class Catalogo:
+    __slots__ = CATEGORIAS
+
+    def __init__(self, dados, descricoes):
+        for categoria in CATEGORIAS:
+            setattr(self, categoria, Opcoes(dados[categoria], descricoes.get(categoria)))
+
+    def motivos(self, time_sessao):
+        return self.motivo_redacao if time_sessao == "Redação" else self.motivo_criacao
+
+
+def _carregar_do_arquivo():
+    with open(ARQUIVO_CATALOGO, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    return dados, dados.get("descricoes", {})
+
+
+def _carregar_do_banco():
+    response = metricas.executar(
+        obter_cliente().table("catalogo_opcoes")
+        .select("categoria, valor, descricao")
+        .eq("ativo", True)
+        .order("categoria")
+        .order("ordem"),
+        "catalogo_opcoes"
+    )
+
+    dados, descricoes = {}, {}
+    for item in response.data:
+        dados.setdefault(item["categoria"], []).append(item["valor"])
+        if item.get("descricao"):
+            descricoes.setdefault(item["categoria"], {})[item["valor"]] = item["descricao"]
+    return dados, descricoes
+
+
+@st.cache_resource(ttl=TTL_CATALOGO, show_spinner=False)
+def _catalogo_do_banco():
+    dados, descricoes = _carregar_do_arquivo()
+    dados_banco, descricoes_banco = _carregar_do_banco()
+
+    for categoria in CATEGORIAS:
+        if dados_banco.get(categoria):
+            dados[categoria] = dados_banco[categoria]
+            descricoes[categoria] = descricoes_banco.get(categoria, {})
+    return Catalogo(dados, descricoes)
+
+
+@st.cache_resource(show_spinner=False)
+def _catalogo_do_arquivo():
+    return Catalogo(*_carregar_do_arquivo())
+
+
+def carregar_catalogo():
+    global _falha_banco
+    if tipo_repositorio() != "supabase":
+        return _catalogo_do_arquivo()
+    if _falha_banco is None or time.monotonic() - _falha_banco >= ESPERA_CATALOGO_FALHA:
+        try:
+            catalogo = _catalogo_do_banco()
+        except Exception:
+            logger.exception("Falha ao carregar catalogo_opcoes; usando %s", ARQUIVO_CATALOGO)
+            _falha_banco = time.monotonic()
+        else:
+            _falha_banco = None
+            return catalogo
+    return _catalogo_do_arquivo()
+
+
+def invalidar_catalogo():
+    global _falha_banco
+    _catalogo_do_banco.clear()
+    _catalogo_do_arquivo.clear()
+    _falha_banco = None
@@ -0,0 +1,107 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+POOL_MAX_CONEXOES = 20
+POOL_MAX_KEEPALIVE = 10
+KEEPALIVE_EXPIRY = 60.0
+TIMEOUT_CONEXAO = 5.0
+TIMEOUT_LEITURA = 30.0
+
+_cliente = None
+_lock_cliente = threading.Lock()
+_env_carregado = False
+
+
+def _carregar_env():
+    global _env_carregado
+    if not _env_carregado:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_carregado = True
+
+
+def configuracao(nome, padrao=None):
+    _carregar_env()
+    valor = os.getenv(f"SUPABASE_{nome.upper()}")
+    if valor:
+        return valor
+    try:
+        return st.secrets["supabase"][nome]
+    except (KeyError, FileNotFoundError):
+        return padrao
+
+
+def _ativo(valor):
+    return str(valor).strip().lower() not in ("0", "false", "nao", "não", "")
+
+
+def configuracao_ativa(nome, padrao=False):
+    valor = configuracao(nome)
+    if valor is None:
+        return padrao
+    return _ativo(valor)
+
+
+def ambiente_ativo(nome):
+    return _ativo(os.environ.get(f"SUPABASE_{nome.upper()}", ""))
+
+
+def _criar_http_client():
+    import httpx
+
+    limites = httpx.Limits(
+        max_connections=int(configuracao("pool_max_conexoes", POOL_MAX_CONEXOES)),
+        max_keepalive_connections=int(configuracao("pool_max_keepalive", POOL_MAX_KEEPALIVE)),
+        keepalive_expiry=float(configuracao("keepalive_expiry", KEEPALIVE_EXPIRY)),
+    )
+    timeout = httpx.Timeout(
+        float(configuracao("timeout_leitura", TIMEOUT_LEITURA)),
+        connect=float(configuracao("timeout_conexao", TIMEOUT_CONEXAO)),
+    )
+    return httpx.Client(http2=True, limits=limites, timeout=timeout)
+
+
+def _criar_cliente():
+    url = configuracao("url")
+    key = configuracao("key")
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL e SUPABASE_KEY precisam estar configurados.")
+
+    from supabase import ClientOptions, create_client
+
+    opcoes = ClientOptions(httpx_client=_criar_http_client())
+    return create_client(url, key, options=opcoes)
+
+
+def obter_cliente():
+    global _cliente
+    if _cliente is None:
+        with _lock_cliente:
+            if _cliente is None:
+                _cliente = _criar_cliente()
+    return _cliente
+
+
+def em_paralelo(*funcoes, retornar_excecoes=False):
+    contexto = get_script_run_ctx(suppress_warning=True)
+
+    def executar(funcao):
+        if contexto is not None:
+            add_script_run_ctx(threading.current_thread(), contexto)
+        return funcao()
+
+    with ThreadPoolExecutor(max_workers=len(funcoes), thread_name_prefix="consulta") as executor:
+        futuros = [executor.submit(executar, funcao) for funcao in funcoes]
+
+    resultados = []
+    for futuro in futuros:
+        excecao = futuro.exception()
+        if excecao is not None and not retornar_excecoes:
+            raise excecao
+        resultados.append(excecao if excecao is not None else futuro.result())
+    return resultados
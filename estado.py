@@ -0,0 +1,93 @@
+from dataclasses import dataclass, field, fields
+
+
+@dataclass(slots=True)
+class Refacao:
+    numero_conteudo: int
+    numero_refacao: int
+    tipo_refacao: str | None = None
+    motivo_refacao: str | None = None
+    time_solicitou_refacao: str | None = None
+    cliente_solicitou_refacao: str | None = None
+    time_responsavel: str | None = None
+    versao: int | None = field(default=None, compare=False)
+
+    @classmethod
+    def de_linha(cls, linha):
+        return cls(versao=linha.get("versao"), **{nome: linha.get(nome) for nome in CAMPOS_REFACAO})
+
+    def como_linha(self, card_id, titulo=None, com_versao=False):
+        linha = {"id_trello_card": card_id}
+        if titulo is not None:
+            linha["titulo"] = titulo
+        for nome in CAMPOS_REFACAO:
+            linha[nome] = getattr(self, nome)
+        if com_versao:
+            linha["versao"] = self.versao
+        return linha
+
+
+CAMPOS_REFACAO = tuple(campo.name for campo in fields(Refacao) if campo.compare)
+CHAVE_REFACAO = ("id_trello_card", "numero_conteudo", "numero_refacao")
+ON_CONFLICT_REFACAO = ",".join(CHAVE_REFACAO)
+
+
+class EstadoCard:
+    __slots__ = ("card_id", "_refacoes", "_por_conteudo", "_contagens")
+
+    def __init__(self, card_id=None, linhas=()):
+        self.card_id = card_id
+        self.carregar(linhas)
+
+    def carregar(self, linhas):
+        self._refacoes = {}
+        self._por_conteudo = {}
+        self._contagens = {}
+        for linha in linhas:
+            self.definir(Refacao.de_linha(linha))
+
+    def __len__(self):
+        return len(self._refacoes)
+
+    def __iter__(self):
+        return iter(self._refacoes.values())
+
+    def obter(self, cont_num, ref_num):
+        return self._refacoes.get((cont_num, ref_num))
+
+    def refacoes_do_conteudo(self, cont_num):
+        return self._por_conteudo.get(cont_num, {})
+
+    def conteudos(self):
+        return sorted(self._contagens)
+
+    def ultimo_conteudo(self):
+        return max(self._contagens, default=0)
+
+    def contagem(self, cont_num):
+        return max(self._contagens.get(cont_num, 0), 1)
+
+    def adicionar_refacao(self, cont_num):
+        self._contagens[cont_num] = self.contagem(cont_num) + 1
+
+    def reservar(self, cont_num, ref_num):
+        if ref_num > self._contagens.get(cont_num, 0):
+            self._contagens[cont_num] = ref_num
+
+    def definir(self, refacao):
+        cont_num, ref_num = refacao.numero_conteudo, refacao.numero_refacao
+        self._refacoes[(cont_num, ref_num)] = refacao
+        self._por_conteudo.setdefault(cont_num, {})[ref_num] = refacao
+        if ref_num > self._contagens.get(cont_num, 0):
+            self._contagens[cont_num] = ref_num
+
+    def remover(self, cont_num, ref_num):
+        refacao = self._refacoes.pop((cont_num, ref_num), None)
+        do_conteudo = self._por_conteudo.get(cont_num, {})
+        do_conteudo.pop(ref_num, None)
+        if do_conteudo:
+            self._contagens[cont_num] = max(do_conteudo)
+        else:
+            self._por_conteudo.pop(cont_num, None)
+            self._contagens.pop(cont_num, None)
+        return refacao
@@ -0,0 +1,152 @@
+import argparse
+import csv
+import sys
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from conexao import obter_cliente
+from estado import CAMPOS_REFACAO, CHAVE_REFACAO, ON_CONFLICT_REFACAO
+from repositorio import filtro_keyset
+
+
+TAMANHO_PAGINA = 1000
+TAMANHO_LOTE_IMPORTACAO = 500
+COLUNAS_IMPORTACAO = ("id_trello_card", "titulo") + CAMPOS_REFACAO
+TIPOS_IMPORTACAO = {
+    coluna: pa.int64() if coluna in ("numero_conteudo", "numero_refacao") else pa.string()
+    for coluna in COLUNAS_IMPORTACAO
+}
+
+
+def paginas_refacoes(tamanho_pagina=TAMANHO_PAGINA):
+    cliente = obter_cliente()
+    ultima_linha = None
+    while True:
+        consulta = cliente.table("cards_refacao").select("*")
+        if ultima_linha is not None:
+            consulta = consulta.or_(filtro_keyset(ultima_linha))
+        response = (
+            consulta
+            .order("id_trello_card").order("numero_conteudo").order("numero_refacao")
+            .limit(tamanho_pagina)
+            .execute()
+        )
+        if not response.data:
+            return
+        yield response.data
+        if len(response.data) < tamanho_pagina:
+            return
+        ultima_linha = response.data[-1]
+
+
+def _adicionar_titulos(linhas):
+    ids = sorted({linha["id_trello_card"] for linha in linhas})
+    response = obter_cliente().table("cards").select("trello_card_id, titulo").in_("trello_card_id", ids).execute()
+    titulos = {item["trello_card_id"]: item["titulo"] for item in response.data}
+    for linha in linhas:
+        linha["titulo_card"] = titulos.get(linha["id_trello_card"])
+
+
+def _esquema(linhas):
+    esquema = pa.Table.from_pylist(linhas).schema
+    for i, campo in enumerate(esquema):
+        if pa.types.is_null(campo.type):
+            esquema = esquema.set(i, pa.field(campo.name, pa.string()))
+    return esquema
+
+
+def _abrir_escritor(destino, formato, esquema):
+    if formato == "parquet":
+        return pq.ParquetWriter(destino, esquema, compression="zstd")
+    return pa_csv.CSVWriter(destino, esquema)
+
+
+def exportar(destino, formato, com_titulo=False, tamanho_pagina=TAMANHO_PAGINA):
+    escritor = None
+    esquema = None
+    total = 0
+    try:
+        for linhas in paginas_refacoes(tamanho_pagina):
+            if com_titulo:
+                _adicionar_titulos(linhas)
+            if escritor is None:
+                esquema = _esquema(linhas)
+                escritor = _abrir_escritor(destino, formato, esquema)
+            escritor.write_table(pa.Table.from_pylist(linhas, schema=esquema))
+            total += len(linhas)
+            print(f"{total} linhas exportadas", file=sys.stderr)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return total
+
+
+def _lotes_arquivo(origem, formato, tamanho_lote):
+    if formato == "parquet":
+        yield from pq.ParquetFile(origem).iter_batches(batch_size=tamanho_lote)
+    else:
+        with open(origem, newline="", encoding="utf-8") as arquivo:
+            cabecalho = next(csv.reader(arquivo), [])
+        colunas = [coluna for coluna in COLUNAS_IMPORTACAO if coluna in cabecalho]
+        conversao = pa_csv.ConvertOptions(
+            column_types={coluna: TIPOS_IMPORTACAO[coluna] for coluna in colunas},
+            include_columns=colunas,
+            strings_can_be_null=True,
+        )
+        leitor = pa_csv.open_csv(
+            origem, read_options=pa_csv.ReadOptions(block_size=1 << 20), convert_options=conversao
+        )
+        for lote in leitor:
+            for inicio in range(0, lote.num_rows, tamanho_lote):
+                yield lote.slice(inicio, tamanho_lote)
+
+
+def importar(origem, formato, tamanho_lote=TAMANHO_LOTE_IMPORTACAO):
+    tabela = obter_cliente().table("cards_refacao")
+    total = 0
+    for lote in _lotes_arquivo(origem, formato, tamanho_lote):
+        colunas = [coluna for coluna in COLUNAS_IMPORTACAO if coluna in lote.schema.names]
+        faltando = set(CHAVE_REFACAO) - set(colunas)
+        if faltando:
+            raise ValueError(f"Arquivo sem as colunas obrigatórias: {', '.join(sorted(faltando))}")
+
+        linhas = lote.select(colunas).to_pylist()
+        tabela.upsert(linhas, on_conflict=ON_CONFLICT_REFACAO, returning="minimal").execute()
+        total += len(linhas)
+        print(f"{total} linhas importadas", file=sys.stderr)
+    return total
+
+
+def _formato(caminho, formato):
+    if formato:
+        return formato
+    return "csv" if caminho.lower().endswith(".csv") else "parquet"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta e importa a tabela cards_refacao em lotes.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    parser_exportar = subparsers.add_parser("exportar", help="Exporta cards_refacao para Parquet ou CSV.")
+    parser_exportar.add_argument("destino")
+    parser_exportar.add_argument("--formato", choices=("parquet", "csv"))
+    parser_exportar.add_argument("--com-titulo", action="store_true", help="Inclui cards.titulo como titulo_card.")
+    parser_exportar.add_argument("--tamanho-pagina", type=int, default=TAMANHO_PAGINA)
+
+    parser_importar = subparsers.add_parser("importar", help="Importa Parquet ou CSV com upsert em lotes.")
+    parser_importar.add_argument("origem")
+    parser_importar.add_argument("--formato", choices=("parquet", "csv"))
+    parser_importar.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE_IMPORTACAO)
+
+    args = parser.parse_args(argv)
+    if args.comando == "exportar":
+        total = exportar(args.destino, _formato(args.destino, args.formato), args.com_titulo, args.tamanho_pagina)
+    else:
+        total = importar(args.origem, _formato(args.origem, args.formato), args.tamanho_lote)
+    print(f"Concluído: {total} linhas.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
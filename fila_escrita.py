@@ -0,0 +1,186 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+from estado import CHAVE_REFACAO
+
+
+INTERVALO_FILA = 0.5
+TAMANHO_LOTE_FILA = 500
+TENTATIVAS_FILA = 5
+ESPERA_MAXIMA_FILA = 10
+LIMITE_STATUS_FILA = 10000
+TIMEOUT_ESVAZIAR = 10
+# Erros que o PostgREST devolve como 503/504: conexão com o banco, recursos e desligamento.
+CODIGOS_TRANSITORIOS = ("PGRST000", "PGRST001", "PGRST002", "PGRST003", "08", "53", "57")
+
+PENDENTE = "pendente"
+SINCRONIZADO = "sincronizado"
+ERRO = "erro"
+
+logger = logging.getLogger("refacao.fila_escrita")
+
+
+def chave_linha(linha):
+    return tuple(linha[coluna] for coluna in CHAVE_REFACAO)
+
+
+def erro_transitorio(erro):
+    import httpx
+    from postgrest.exceptions import APIError
+
+    if isinstance(erro, httpx.TransportError):
+        return True
+    if isinstance(erro, httpx.HTTPStatusError):
+        return erro.response.status_code >= 500
+    if isinstance(erro, APIError):
+        if isinstance(erro.code, int):
+            return erro.code >= 500
+        return str(erro.code).startswith(CODIGOS_TRANSITORIOS)
+    return False
+
+
+class FilaEscrita:
+    def __init__(self, repositorio, intervalo=INTERVALO_FILA, tamanho_lote=TAMANHO_LOTE_FILA):
+        self._repositorio = repositorio
+        self._intervalo = intervalo
+        self._tamanho_lote = tamanho_lote
+        self._condicao = threading.Condition()
+        self._pendentes = OrderedDict()
+        self._status = OrderedDict()
+        self._em_envio = 0
+        self._thread = threading.Thread(target=self._executar, name="fila-escrita", daemon=True)
+        self._thread.start()
+
+    def _marcar(self, chave, status, registro=None, erro=None):
+        self._status[chave] = (status, registro, erro)
+        self._status.move_to_end(chave)
+        while len(self._status) > LIMITE_STATUS_FILA:
+            self._status.popitem(last=False)
+
+    def _enfileirar(self, chave, operacao):
+        self._pendentes.pop(chave, None)
+        self._pendentes[chave] = operacao
+        self._marcar(chave, PENDENTE)
+
+    def salvar(self, linhas):
+        with self._condicao:
+            for linha in linhas:
+                self._enfileirar(chave_linha(linha), ("salvar", linha))
+            self._condicao.notify()
+
+    def excluir(self, chaves):
+        with self._condicao:
+            for chave in chaves:
+                self._enfileirar(tuple(chave), ("excluir", None))
+            self._condicao.notify()
+
+    def status(self, chave):
+        with self._condicao:
+            return self._status.get(chave)
+
+    def __len__(self):
+        with self._condicao:
+            return len(self._pendentes) + self._em_envio
+
+    def _retirar_lote(self):
+        lote = []
+        while self._pendentes and len(lote) < self._tamanho_lote:
+            lote.append(self._pendentes.popitem(last=False))
+        return lote
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while not self._pendentes:
+                    self._condicao.wait()
+            time.sleep(self._intervalo)
+
+            with self._condicao:
+                lote = self._retirar_lote()
+                self._em_envio = len(lote)
+            try:
+                self._enviar(lote)
+            except Exception as e:
+                logger.exception("Falha inesperada ao enviar %d escritas da fila", len(lote))
+                with self._condicao:
+                    for chave, _ in lote:
+                        if chave not in self._pendentes:
+                            self._marcar(chave, ERRO, erro=str(e))
+            finally:
+                with self._condicao:
+                    self._em_envio = 0
+                    self._condicao.notify_all()
+
+    def _enviar(self, lote):
+        salvar = [operacao[1] for _, operacao in lote if operacao[0] == "salvar"]
+        excluir = [chave for chave, operacao in lote if operacao[0] == "excluir"]
+
+        erros = {}
+        gravadas = self._aplicar(self._gravar, salvar, chave_linha, erros)
+        self._aplicar(self._excluir, excluir, tuple, erros)
+        registros = {chave_linha(linha): linha for linha in gravadas}
+
+        with self._condicao:
+            for chave, _ in lote:
+                if chave in self._pendentes:
+                    continue
+                if chave in erros:
+                    self._marcar(chave, ERRO, erro=erros[chave])
+                else:
+                    self._marcar(chave, SINCRONIZADO, registro=registros.get(chave))
+
+    def _aplicar(self, operacao, itens, chave, erros):
+        if not itens:
+            return []
+        try:
+            return operacao(itens) or []
+        except Exception as e:
+            if erro_transitorio(e) or len(itens) == 1:
+                logger.exception("Falha ao enviar %d escritas da fila", len(itens))
+                erros.update((chave(item), str(e)) for item in itens)
+                return []
+        meio = len(itens) // 2
+        return self._aplicar(operacao, itens[:meio], chave, erros) + self._aplicar(operacao, itens[meio:], chave, erros)
+
+    @retry(
+        retry=retry_if_exception(erro_transitorio), stop=stop_after_attempt(TENTATIVAS_FILA),
+        wait=wait_exponential(multiplier=0.5, max=ESPERA_MAXIMA_FILA), reraise=True
+    )
+    def _gravar(self, linhas):
+        return self._repositorio.salvar_refacoes(linhas)
+
+    @retry(
+        retry=retry_if_exception(erro_transitorio), stop=stop_after_attempt(TENTATIVAS_FILA),
+        wait=wait_exponential(multiplier=0.5, max=ESPERA_MAXIMA_FILA), reraise=True
+    )
+    def _excluir(self, chaves):
+        self._repositorio.excluir_refacoes(chaves)
+
+    def esvaziar(self, timeout=TIMEOUT_ESVAZIAR):
+        limite = time.monotonic() + timeout
+        with self._condicao:
+            while self._pendentes or self._em_envio:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                self._condicao.wait(restante)
+        return True
+
+
+_fila = None
+_lock_fila = threading.Lock()
+
+
+def obter_fila(repositorio):
+    global _fila
+    if _fila is None:
+        with _lock_fila:
+            if _fila is None:
+                _fila = FilaEscrita(repositorio)
+                atexit.register(_fila.esvaziar)
+    return _fila
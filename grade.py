@@ -0,0 +1,110 @@
+import dataclasses
+
+import streamlit as st
+
+from estado import CAMPOS_REFACAO
+
+
+CONTEUDOS_POR_PAGINA = 10
+COLUNAS_EDITAVEIS = ("tipo_refacao", "motivo_refacao", "time_solicitou_refacao", "cliente_solicitou_refacao")
+ROTULOS = {"time_solicitou_refacao": "Time que solicitou", "cliente_solicitou_refacao": "Cliente que solicitou"}
+
+
+def paginas(estado):
+    conteudos = estado.conteudos()
+    return [conteudos[i:i + CONTEUDOS_POR_PAGINA] for i in range(0, len(conteudos), CONTEUDOS_POR_PAGINA)]
+
+
+def quadro(estado, conteudos, edicoes):
+    import pandas as pd
+
+    linhas = []
+    for cont_num in conteudos:
+        for ref_num, refacao in sorted(estado.refacoes_do_conteudo(cont_num).items()):
+            linha = {campo: getattr(refacao, campo) for campo in CAMPOS_REFACAO}
+            linha.update(edicoes.get((cont_num, ref_num), {}))
+            linhas.append(linha)
+    return pd.DataFrame(linhas, columns=list(CAMPOS_REFACAO))
+
+
+def _opcoes(opcoes, serie):
+    extras = sorted({valor for valor in serie.dropna() if valor not in opcoes})
+    return list(opcoes.valores) + extras
+
+
+def motivos(catalogo):
+    return list(dict.fromkeys(catalogo.motivo_criacao.valores + catalogo.motivo_redacao.valores[1:]))
+
+
+def configuracao_colunas(catalogo, df):
+    opcoes_motivo = motivos(catalogo)
+    opcoes_motivo += sorted({valor for valor in df["motivo_refacao"].dropna() if valor not in opcoes_motivo})
+    return {
+        "numero_conteudo": st.column_config.NumberColumn("Conteúdo", disabled=True),
+        "numero_refacao": st.column_config.NumberColumn("Refação", disabled=True),
+        "tipo_refacao": st.column_config.SelectboxColumn("Tipo", options=_opcoes(catalogo.tipo, df["tipo_refacao"])),
+        "motivo_refacao": st.column_config.SelectboxColumn("Motivo", options=opcoes_motivo, width="large"),
+        "time_solicitou_refacao": st.column_config.SelectboxColumn(
+            ROTULOS["time_solicitou_refacao"], options=_opcoes(catalogo.time, df["time_solicitou_refacao"]),
+            help="Só para refações Interna."
+        ),
+        "cliente_solicitou_refacao": st.column_config.SelectboxColumn(
+            ROTULOS["cliente_solicitou_refacao"], options=_opcoes(catalogo.cliente, df["cliente_solicitou_refacao"]),
+            help="Só para refações Externa."
+        ),
+        "time_responsavel": st.column_config.TextColumn("Time responsável", disabled=True),
+    }
+
+
+def mesclar_edicoes(edicoes, df, linhas_editadas):
+    rejeitadas = []
+    for indice, mudancas in linhas_editadas.items():
+        linha = df.iloc[int(indice)]
+        chave = (int(linha["numero_conteudo"]), int(linha["numero_refacao"]))
+        mudancas = {campo: valor for campo, valor in mudancas.items() if campo in COLUNAS_EDITAVEIS}
+        tipo = mudancas.get("tipo_refacao", linha["tipo_refacao"])
+        limpos = _campos_limpos(tipo)
+        rejeitadas += [(chave, campo, tipo) for campo in limpos if mudancas.get(campo) is not None]
+        edicoes.setdefault(chave, {}).update(mudancas, **limpos)
+    return rejeitadas
+
+
+def _campos_limpos(tipo):
+    if tipo == "Interna":
+        return {"cliente_solicitou_refacao": None}
+    if tipo == "Externa":
+        return {"time_solicitou_refacao": None}
+    return {}
+
+
+def _normalizar(refacao):
+    for campo, valor in _campos_limpos(refacao.tipo_refacao).items():
+        setattr(refacao, campo, valor)
+    return refacao
+
+
+def mudancas_normalizadas(mudancas):
+    return {**mudancas, **_campos_limpos(mudancas.get("tipo_refacao"))}
+
+
+def aplicar(refacao, mudancas):
+    return _normalizar(dataclasses.replace(refacao, **mudancas))
+
+
+def podar(estado, edicoes, manter=()):
+    for chave in list(edicoes):
+        existente = estado.obter(*chave)
+        if chave not in manter and (existente is None or aplicar(existente, edicoes[chave]) == existente):
+            del edicoes[chave]
+
+
+def alteracoes(estado, edicoes):
+    resultado = []
+    for (cont_num, ref_num), mudancas in sorted(edicoes.items()):
+        existente = estado.obter(cont_num, ref_num)
+        if existente is None:
+            continue
+        refacao = aplicar(existente, mudancas)
+        if refacao != existente:
+            resultado.append(refacao)
+    return resultado
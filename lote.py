@@ -0,0 +1,50 @@
+import pandas as pd
+
+import grade
+from estado import CAMPOS_REFACAO, CHAVE_REFACAO, Refacao
+
+
+COLUNAS_LOTE = ("titulo",) + CAMPOS_REFACAO
+ROTULOS_LOTE = {
+    "titulo": "Card",
+    "numero_conteudo": "Conteúdo",
+    "numero_refacao": "Refação",
+    "tipo_refacao": "Tipo",
+    "motivo_refacao": "Motivo",
+    "time_solicitou_refacao": "Time que solicitou",
+    "cliente_solicitou_refacao": "Cliente que solicitou",
+    "time_responsavel": "Time responsável",
+}
+
+
+def quadro(linhas, titulos_por_id):
+    df = pd.DataFrame(linhas, columns=["id_trello_card", *CAMPOS_REFACAO, "versao"])
+    df.insert(0, "titulo", df["id_trello_card"].map(titulos_por_id))
+    return df
+
+
+def filtrar(df, conteudos=None, tipos=None):
+    mascara = pd.Series(True, index=df.index)
+    if conteudos is not None:
+        mascara &= df["numero_conteudo"].between(*conteudos)
+    if tipos:
+        mascara &= df["tipo_refacao"].isin(tipos)
+    return df[mascara]
+
+
+def chaves(df):
+    return [tuple(linha) for linha in df[list(CHAVE_REFACAO)].itertuples(index=False)]
+
+
+def chaves_versionadas(df):
+    return [(*chave, int(versao)) for *chave, versao in df[[*CHAVE_REFACAO, "versao"]].itertuples(index=False)]
+
+
+def linhas_atualizadas(df, mudancas):
+    linhas = []
+    for registro in df.to_dict("records"):
+        versao = registro.get("versao")
+        registro["versao"] = None if pd.isna(versao) else int(versao)
+        refacao = grade.aplicar(Refacao.de_linha(registro), mudancas)
+        linhas.append(refacao.como_linha(registro["id_trello_card"], registro["titulo"], com_versao=True))
+    return linhas
@@ -1,471 +1,762 @@
+import time
+
 import streamlit as st
-import os
-from dotenv import load_dotenv
-from supabase import create_client, Client
-import pandas as pd
 
+import perfil
 
-def check_password():
-    if "password_correct" not in st.session_state:
-        st.session_state.password_correct = False
+inicio_execucao = time.perf_counter()
+perfil.ativar()
 
-    if not st.session_state.password_correct:
-        st.markdown("### 🔒")
-        password = st.text_input("Digite a senha:", type="password")
+from autenticacao import check_password
+import metricas
 
-        if password == st.secrets["general"]["password"]:
-            st.session_state.password_correct = True
-            st.rerun()
-        elif password:
-            st.error("Senha incorreta")
-            st.stop()
-        else:
-            st.stop()
 
-    return True
+try:
+    with metricas.fase("autenticacao"):
+        if check_password():
+            st.title("")   
+finally:
+    perfil.marcar("autenticacao", inicio_execucao)
 
 
-if check_password():
-    st.title("")   
+from conexao import configuracao_ativa, em_paralelo
+from catalogo import carregar_catalogo, invalidar_catalogo
+from estado import EstadoCard, Refacao
+from fila_escrita import ERRO, PENDENTE, SINCRONIZADO, obter_fila
+from titulos import buscar_titulos, carregar_indice_titulos, invalidar_titulos
+import grade
+import sessao
+import tempo_real
 
 
-load_dotenv()
-url: str = os.getenv("SUPABASE_URL") or st.secrets["supabase"]["url"]
-key: str = os.getenv("SUPABASE_KEY") or st.secrets["supabase"]["key"]
+INTERVALO_TEMPO_REAL = 2
+CONTEUDOS_PADRAO = 20
 
-supabase = create_client(url, key)
+
+def adicionar_refacao_callback(conteudo_id):
+    st.session_state.estado_card.adicionar_refacao(conteudo_id)
+
+
+
+def precarregar(carregador):
+    if st.session_state.get('precarregado'):
+        return carregador()
+    _, resultado = em_paralelo(carregar_catalogo, carregador, retornar_excecoes=True)
+    st.session_state.precarregado = True
+    if isinstance(resultado, Exception):
+        raise resultado
+    return resultado
+
+
+
+def escrita_versionada():
+    return configuracao_ativa("escrita_versionada")
+
+
+
+def escrita_assincrona():
+    return configuracao_ativa("escrita_assincrona") and not escrita_versionada()
+
+
+
+def salvar_alteracoes(card_id, titulo, alteracoes):
+    estado = st.session_state.estado_card
+
+    if escrita_assincrona():
+        obter_fila(metricas.repositorio()).salvar([refacao.como_linha(card_id, titulo) for refacao in alteracoes])
+        st.session_state.escritas_pendentes.update(
+            (card_id, refacao.numero_conteudo, refacao.numero_refacao) for refacao in alteracoes
+        )
+        return []
+
+    if escrita_versionada():
+        linhas = [refacao.como_linha(card_id, titulo, com_versao=True) for refacao in alteracoes]
+        conflitos = []
+        for resultado in metricas.repositorio().salvar_refacoes_versionadas(linhas):
+            chave = (resultado["conteudo"], resultado["refacao"])
+            if resultado["registro"]:
+                estado.definir(Refacao.de_linha(resultado["registro"]))
+            else:
+                estado.remover(*chave)
+            if resultado["status"] == "conflito":
+                conflitos.append(chave)
+        return conflitos
+
+    linhas = [refacao.como_linha(card_id, titulo) for refacao in alteracoes]
+    for linha in metricas.repositorio().salvar_refacoes(linhas):
+        estado.definir(Refacao.de_linha(linha))
+    return []
 
 
-try:
-    response = supabase.table("cards").select("titulo").execute()
-    titulos = [item['titulo'] for item in response.data]
-except Exception as e:
-    st.error(f"Erro ao carregar títulos dos cards: {e}")
-    titulos = []
-
-
-def texto_de_ajuda():
-    return  """
-    - **Briefing incompleto**: Material de referência estava incompleto ou pouco claro  
-    - **Execução fora do direcionamento**: Redator não seguiu corretamente o briefing ou roteiro  
-    - **Tom ou linguagem inadequada**: Texto fora do tom de voz da marca, linguagem genérica ou inadequada  
-    - **Alteração de rota pelo cliente**: Cliente mudou o pedido após entrega, mesmo com briefing validado  
-    - **Solicitação estética (subjetiva)**: Mudança de palavras ou estilo por preferência subjetiva do cliente ou CS  
-    - **Erro técnico de escrita**: Erros gramaticais, ortográficos ou de digitação  
-    - **Erro de informação técnica**: Informações incorretas sobre produto, processo ou tema abordado  
-    - **Ajuste por atualização de informações**: Mudança de contexto após entrega: campanha pausada, dados atualizados etc.
-    """
-
-
-def adicionar_refacao_callback(conteudo_id, count_atual):
-    st.session_state.refacao_counts[conteudo_id] = count_atual + 1
-
-
-
-def sincronizar_dados(card_id):
-    response_refacoes = supabase.table("cards_refacao").select("*").eq("id_trello_card", card_id).execute()
-
-    if response_refacoes.data:
-        st.session_state.tem_card_refacao_data = response_refacoes.data
-        st.session_state.refacao_counts = {}
-        for r in st.session_state.tem_card_refacao_data:
-            cont_num = r['numero_conteudo']
-            ref_num = r['numero_refacao']
-            current_max = st.session_state.refacao_counts.get(cont_num, 0)
-            st.session_state.refacao_counts[cont_num] = max(current_max, ref_num)
-    else:
-        st.session_state.tem_card_refacao_data = []
-        st.session_state.refacao_counts = {}
 
+def manipular_exclusao(card_id, cont_num, ref_num):
+    existente = st.session_state.estado_card.obter(cont_num, ref_num)
+    existe_no_banco = existente is not None
 
+    if escrita_assincrona():
+        chave = (card_id, cont_num, ref_num)
+        if existe_no_banco or chave in st.session_state.escritas_pendentes:
+            obter_fila(metricas.repositorio()).excluir([chave])
+            st.session_state.escritas_pendentes.add(chave)
+            adicionar_aviso(f"Exclusão da refação {ref_num} do conteúdo {cont_num} enfileirada.", "⏳")
 
-def manipular_exclusao(card_id, cont_num, ref_num, existe_no_banco):
+    elif existe_no_banco:
+        versao = existente.versao if escrita_versionada() else None
 
-    if existe_no_banco:
         try:
-            supabase.table("cards_refacao").delete().match({
-                "id_trello_card": card_id,
-                "numero_conteudo": cont_num,
-                "numero_refacao": ref_num
-            }).execute()
-            st.success(f"Refação {ref_num} do conteúdo {cont_num} excluída do banco.")
+            if not metricas.repositorio().excluir_refacao(card_id, cont_num, ref_num, versao):
+                atual = metricas.repositorio().obter_refacao(card_id, cont_num, ref_num)
+                if atual:
+                    st.session_state.estado_card.definir(Refacao.de_linha(atual))
+                    limpar_widgets_refacao(card_id, cont_num, ref_num)
+                    adicionar_aviso(f"Refação {ref_num} do conteúdo {cont_num} foi alterada por outra pessoa e não foi excluída.", "⚠️")
+                    return
+            adicionar_aviso(f"Refação {ref_num} do conteúdo {cont_num} excluída do banco.", "✅")
             
         except Exception as e:
-            st.error(f"Erro ao excluir a refação do banco: {e}")
+            adicionar_aviso(f"Erro ao excluir a refação do banco: {e}", "🚨")
+            return
 
-    if st.session_state.refacao_counts.get(cont_num, 0) > 1:
-        st.session_state.refacao_counts[cont_num] -= 1
-    elif st.session_state.refacao_counts.get(cont_num, 0) == 1:
-        st.session_state.refacao_counts[cont_num] = 1 
-    
-    keys_to_delete = [
-        f'tipo-{card_id}-{cont_num}-{ref_num}', f'motivo-{card_id}-{cont_num}-{ref_num}',
-        f'time-{card_id}-{cont_num}-{ref_num}', f'cliente-{card_id}-{cont_num}-{ref_num}',
-        f'placeholder-{card_id}-{cont_num}-{ref_num}'
-    ]
-    for key in keys_to_delete:
-        if key in st.session_state:
-            del st.session_state[key]
-    sincronizar_dados(card_id)
+    st.session_state.estado_card.remover(cont_num, ref_num)
+    st.session_state.conflitos_tempo_real.discard((cont_num, ref_num))
+    limpar_widgets_refacao(card_id, cont_num, ref_num)
 
 
 
+def limpar_widgets_refacao(card_id, cont_num, ref_num):
+    for prefixo in sessao.PREFIXOS_REFACAO:
+        st.session_state.pop(f'{prefixo}-{card_id}-{cont_num}-{ref_num}', None)
+    sessao.rascunho(card_id).pop((cont_num, ref_num), None)
 
-def main():
-    st.sidebar.markdown("## Refação")
-    time_responsavel_sessao = st.sidebar.selectbox('Time', ('Criação', 'Redação'), key='time_sessao_atual') 
-    st.markdown(f'## Refação {time_responsavel_sessao}')
 
-    dados_para_salvar = [] 
-    id_card = None 
-    tem_card_refacao_data = []
-    dados_para_atualizar = []
-    dados_para_inserir = []
 
+def refacao_vazia(refacao):
+    return all(not valor or not valor.strip() for valor in (refacao.tipo_refacao, refacao.motivo_refacao))
 
 
-    if 'refacao_counts' not in st.session_state:
-        st.session_state.refacao_counts = {}
-    
-    if 'current_card_id' not in st.session_state:
-        st.session_state.current_card_id = None
 
-    if 'tem_card_refacao_data' not in st.session_state:
-        st.session_state.tem_card_refacao_data = []
+def compactar_card(time_sessao):
+    estado = st.session_state.estado_card
+    card_id = estado.card_id
+    if card_id is None:
+        return
 
-    with st.container():
-        st.markdown('### Dados da Refação')
+    rascunho = dict(sessao.rascunho(card_id))
+    for cont_num, ref_num in sessao.linhas_com_widgets(card_id):
+        refacao = coletar_refacao(card_id, cont_num, ref_num, time_sessao)
+        existente = estado.obter(cont_num, ref_num)
+        if refacao == existente or (existente is None and refacao_vazia(refacao)):
+            rascunho.pop((cont_num, ref_num), None)
+        else:
+            rascunho[(cont_num, ref_num)] = refacao
 
+    for chave, mudancas in st.session_state.edicoes_grade.items():
+        existente = estado.obter(*chave)
+        if existente is not None and grade.aplicar(existente, mudancas) != existente:
+            rascunho[chave] = grade.aplicar(existente, mudancas)
+    st.session_state.edicoes_grade = {}
 
-        nome_card_refacao = st.text_input(
-            'Nome card:', 
-            key='nome_card_selecionado'
-        )
+    sessao.guardar_rascunho(card_id, rascunho)
+    sessao.limpar_card(card_id)
 
-      
-        if nome_card_refacao:   
-            if nome_card_refacao not in titulos:
-                st.warning("O card não foi encontrado")
-                st.session_state.current_card_id = None 
+
+
+def fechar_card(time_sessao):
+    compactar_card(time_sessao)
+    tempo_real.cancelar(st.session_state.get('assinatura_tempo_real'))
+    st.session_state.assinatura_tempo_real = None
+    st.session_state.conflitos_tempo_real = set()
+    st.session_state.estado_card = EstadoCard()
+
+
+
+def abrir_card(titulo, card_id, time_sessao):
+    fechar_card(time_sessao)
+
+    try:
+        st.session_state.assinatura_tempo_real = tempo_real.assinar(card_id)
+    except Exception as e:
+        st.warning(f"Atualização em tempo real indisponível: {e}")
+
+    card = metricas.repositorio().carregar_card(titulo)
+    if card is None or card[0] != card_id:
+        fechar_card(time_sessao)
+        return False
+
+    _, linhas = card
+    estado = EstadoCard(card_id, linhas)
+    for cont_num, ref_num in sessao.rascunho(card_id):
+        estado.reservar(cont_num, ref_num)
+    st.session_state.estado_card = estado
+    return True
+
+
+
+def refacao_editada(card_id, cont_num, ref_num, time_sessao):
+    if f'tipo-{card_id}-{cont_num}-{ref_num}' not in st.session_state:
+        return False
+    return coletar_refacao(card_id, cont_num, ref_num, time_sessao) != st.session_state.estado_card.obter(cont_num, ref_num)
+
+
+
+def aplicar_eventos_tempo_real(card_id, time_sessao):
+    assinatura = st.session_state.get('assinatura_tempo_real')
+    if assinatura is None or assinatura.card_id != card_id:
+        return
+
+    estado = st.session_state.estado_card
+    for tipo, registro, anterior in assinatura.pendentes():
+        linha = anterior if tipo == "DELETE" else registro
+        cont_num, ref_num = linha.get("numero_conteudo"), linha.get("numero_refacao")
+        if cont_num is None or ref_num is None:
+            continue
+
+        atual = estado.obter(cont_num, ref_num)
+        nova = None if tipo == "DELETE" else Refacao.de_linha(registro)
+        if (card_id, cont_num, ref_num) in st.session_state.escritas_pendentes:
+            continue
+        if nova == atual:
+            if nova is not None and nova.versao != atual.versao:
+                estado.definir(nova)
+            continue
+
+        if refacao_editada(card_id, cont_num, ref_num, time_sessao):
+            st.session_state.conflitos_tempo_real.add((cont_num, ref_num))
+        else:
+            limpar_widgets_refacao(card_id, cont_num, ref_num)
+
+        if nova is None:
+            estado.remover(cont_num, ref_num)
+            st.toast(f"Refação {ref_num} do conteúdo {cont_num} excluída por outra pessoa.", icon="🔄")
+        else:
+            estado.definir(nova)
+            st.toast(f"Refação {ref_num} do conteúdo {cont_num} atualizada por outra pessoa.", icon="🔄")
+
+
+
+def aplicar_escritas_concluidas(card_id):
+    pendentes = st.session_state.escritas_pendentes
+    if not pendentes:
+        return
+
+    fila = obter_fila(metricas.repositorio())
+    estado = st.session_state.estado_card
+    for chave in list(pendentes):
+        status = fila.status(chave)
+        if status is not None and status[0] == PENDENTE:
+            continue
+
+        pendentes.discard(chave)
+        if status is None or chave[0] != card_id:
+            continue
+        situacao, registro, erro = status
+        _, cont_num, ref_num = chave
+        if situacao == SINCRONIZADO:
+            if registro:
+                estado.definir(Refacao.de_linha(registro))
             else:
-                response_id = supabase.table("cards").select("trello_card_id").eq("titulo", nome_card_refacao).execute()
-                if response_id.data:
-                    id_card = response_id.data[0]["trello_card_id"]
-
-                    if st.session_state.current_card_id != id_card:
-                        st.session_state.current_card_id = id_card
-                        st.session_state.refacao_counts = {}
-                        st.session_state.tem_card_refacao_data = []
-                        
-                        response_refacoes = supabase.table("cards_refacao").select("*").eq("id_trello_card", id_card).execute()
-                        
-                        if response_refacoes.data:
-                            st.session_state.tem_card_refacao_data = response_refacoes.data
-                            st.info(f"{len(st.session_state.tem_card_refacao_data)} registros de refação encontrados.")
-                            
-                            for r in st.session_state.tem_card_refacao_data:
-                                cont_num = r['numero_conteudo']
-                                ref_num = r['numero_refacao']
-                                current_max = st.session_state.refacao_counts.get(cont_num, 0)
-                                st.session_state.refacao_counts[cont_num] = max(current_max, ref_num)
-                        else:
-                            st.info("Card encontrado, nenhuma refação registrada.")
-                    
-                    st.success("Card carregado.")
-                else:
-                    st.error("Card não encontrado no banco.")
-                    st.session_state.current_card_id = None
+                estado.remover(cont_num, ref_num)
+        elif situacao == ERRO:
+            st.toast(f"Refação {ref_num} do conteúdo {cont_num} não foi salva: {erro}. Salve novamente.", icon="🚨")
+
+
+def escritas_concluidas():
+    pendentes = st.session_state.get('escritas_pendentes')
+    if not pendentes:
+        return False
+    fila = obter_fila(metricas.repositorio())
+    return any((fila.status(chave) or (None,))[0] != PENDENTE for chave in pendentes)
+
+
+def status_escrita(card_id, cont_num, ref_num):
+    if not escrita_assincrona():
+        return ""
+    status = obter_fila(metricas.repositorio()).status((card_id, cont_num, ref_num))
+    if status is None:
+        return ""
+    return {PENDENTE: " · ⏳ pendente", SINCRONIZADO: " · ✅ sincronizado", ERRO: " · ⚠️ erro ao salvar"}[status[0]]
+
+
+
+def resolver_conflito(card_id, cont_num, ref_num, usar_banco):
+    st.session_state.conflitos_tempo_real.discard((cont_num, ref_num))
+    if usar_banco:
+        limpar_widgets_refacao(card_id, cont_num, ref_num)
+
+
+
+
+def adicionar_aviso(mensagem, icone):
+    st.session_state.setdefault('avisos', []).append((mensagem, icone))
+
+
+def exibir_avisos():
+    for mensagem, icone in st.session_state.pop('avisos', []):
+        st.toast(mensagem, icon=icone)
+
+
+def time_da_refacao(dados_existentes, time_sessao):
+    if dados_existentes and dados_existentes.time_responsavel:
+        return dados_existentes.time_responsavel
+    return time_sessao
+
+
+def coletar_refacao(card_id, cont_num, ref_num, time_sessao):
+    dados_existentes = st.session_state.estado_card.obter(cont_num, ref_num)
+    sufixo = f'{card_id}-{cont_num}-{ref_num}'
+    tipo = st.session_state.get(f'tipo-{sufixo}', ' ')
+
+    return Refacao(
+        numero_conteudo=cont_num,
+        numero_refacao=ref_num,
+        tipo_refacao=tipo,
+        motivo_refacao=st.session_state.get(f'motivo-{sufixo}'),
+        time_solicitou_refacao=st.session_state.get(f'time-{sufixo}') if tipo == 'Interna' else None,
+        cliente_solicitou_refacao=st.session_state.get(f'cliente-{sufixo}') if tipo == 'Externa' else None,
+        time_responsavel=time_da_refacao(dados_existentes, time_sessao),
+        versao=dados_existentes.versao if dados_existentes else None
+    )
+
+
+
+@st.fragment
+def painel_refacao(id_card, conteudo_selecionado, ref_num, time_responsavel_sessao):
+    if ref_num > st.session_state.estado_card.contagem(conteudo_selecionado):
+        st.rerun()
+    exibir_avisos()
+
+    dados_existentes = st.session_state.estado_card.obter(conteudo_selecionado, ref_num)
+    rascunho = sessao.rascunho(id_card)
+    dados_iniciais = rascunho.get((conteudo_selecionado, ref_num)) or dados_existentes
+    catalogo = carregar_catalogo()
+
+    if (conteudo_selecionado, ref_num) in st.session_state.conflitos_tempo_real:
+        if dados_existentes:
+            versao_banco = " · ".join(
+                v for v in (dados_existentes.tipo_refacao, dados_existentes.motivo_refacao,
+                            dados_existentes.time_solicitou_refacao, dados_existentes.cliente_solicitou_refacao)
+                if v and v.strip()
+            )
+            st.warning(f"{ref_num}ª refação alterada por outra pessoa enquanto você editava. Versão do banco: {versao_banco or '(vazia)'}")
+        else:
+            st.warning(f"{ref_num}ª refação excluída por outra pessoa enquanto você editava.")
+
+        col_banco, col_minha = st.columns(2)
+        col_banco.button(
+            "Usar versão do banco",
+            key=f'CONFLITO_BANCO-{id_card}-{conteudo_selecionado}-{ref_num}',
+            on_click=resolver_conflito,
+            args=(id_card, conteudo_selecionado, ref_num, True)
+        )
+        col_minha.button(
+            "Manter minha versão",
+            key=f'CONFLITO_MINHA-{id_card}-{conteudo_selecionado}-{ref_num}',
+            on_click=resolver_conflito,
+            args=(id_card, conteudo_selecionado, ref_num, False)
+        )
+
+    tag_time = ""
+    time_responsavel = time_da_refacao(dados_existentes, time_responsavel_sessao)
+    if time_responsavel == "Criação":
+        tag_time = "🎨 [Criação]"
+    elif time_responsavel == "Redação":
+        tag_time = "✍️ [Redação]"
+
+    with st.expander(f"#### {ref_num}ª Refação {tag_time}{status_escrita(id_card, conteudo_selecionado, ref_num)}", expanded=True):
         
-      
-        if id_card:
+        col1, col2, col3 = st.columns(3) 
+        
+
+        with col1:
+            key_tipo = f'tipo-{id_card}-{conteudo_selecionado}-{ref_num}'
+            valor_atual = st.session_state.get(key_tipo, None)
+            
+            idx_tipo = 0
+            if valor_atual:
+                idx_tipo = catalogo.tipo.indice(valor_atual)
+            elif dados_iniciais:
+                idx_tipo = catalogo.tipo.indice(dados_iniciais.tipo_refacao)
             
-            conteudo_selecionado = st.slider(
-                'Selecione o Conteúdo:', 1, 20, 1,
-                key=f'slider-conteudo-{id_card}' 
+            st.selectbox(
+                'Tipo Refação', catalogo.tipo.valores,
+                key=key_tipo, 
+                index=idx_tipo
             )
-            st.markdown(f"### Refações para o {conteudo_selecionado}° Conteúdo")
 
-       
-            num_refacoes = st.session_state.refacao_counts.get(conteudo_selecionado, 1)
 
+        with col2:
+            
+
+            motivos = catalogo.motivos(time_responsavel_sessao)
+
+            key_motivo = f'motivo-{id_card}-{conteudo_selecionado}-{ref_num}'
+            idx_motivo = 0
+            
+            
+            valor_a_exibir = None
+            
+            
+            if dados_iniciais and dados_iniciais.motivo_refacao:
+                valor_a_exibir = dados_iniciais.motivo_refacao.strip()
+           
+            else:
+                valor_sessao = st.session_state.get(key_motivo, None)
+                if valor_sessao:
+                    valor_a_exibir = valor_sessao.strip()
+
+            opcoes_motivo = motivos.com_valor(valor_a_exibir)
+
+            if valor_a_exibir:
+                idx_motivo = motivos.indices.get(valor_a_exibir, len(opcoes_motivo) - 1)
+            
+            st.selectbox(
+                'Motivo Refação', 
+                opcoes_motivo,
+                key=key_motivo,
+                index=idx_motivo,
+                help=motivos.ajuda()
+            )
+
+            
+           
+        with col3:
+            key_da_col1 = f'tipo-{id_card}-{conteudo_selecionado}-{ref_num}'
+            valor_real_da_col1 = st.session_state.get(key_da_col1, ' ') 
+        
+            if valor_real_da_col1 == 'Interna': 
+                key_time = f'time-{id_card}-{conteudo_selecionado}-{ref_num}'
+                valor_time = st.session_state.get(key_time, None)
+
+                idx_time = 0
+                if valor_time:
+                    idx_time = catalogo.time.indice(valor_time)
+                elif dados_iniciais:
+                    idx_time = catalogo.time.indice(dados_iniciais.time_solicitou_refacao)
+
+                st.selectbox(
+                    'Time que solicitou:', catalogo.time.valores, 
+                    key=key_time,
+                    index=idx_time
+                )
+            elif valor_real_da_col1 == 'Externa':
+                key_cliente = f'cliente-{id_card}-{conteudo_selecionado}-{ref_num}'
+                valor_cliente = st.session_state.get(key_cliente, None)
+
+                idx_cliente = 0
+                if valor_cliente:
+                    idx_cliente = catalogo.cliente.indice(valor_cliente)
+                elif dados_iniciais:
+                    idx_cliente = catalogo.cliente.indice(dados_iniciais.cliente_solicitou_refacao)
+
+                st.selectbox(
+                    'Cliente que solicitou:', catalogo.cliente.valores, 
+                    key=key_cliente,
+                    index=idx_cliente
+                )
+            else:
+                st.selectbox(
+                    'Time/Cliente',
+                    ['Selecione um Tipo de Refação'],
+                    disabled=True,
+                    key=f'placeholder-{id_card}-{conteudo_selecionado}-{ref_num}'
+                )
 
+        
+        _, col_btn_apagar = st.columns([4, 1]) 
+        
+        with col_btn_apagar:
             st.button(
-                f"Adicionar Refação",
-                key = f'ADD_GLOBAL_{id_card}_{conteudo_selecionado}',
-                on_click=adicionar_refacao_callback,
-                args=(conteudo_selecionado, num_refacoes)
+                "Excluir",
+                key=f'DELETE_GLOBAL-{id_card}-{conteudo_selecionado}-{ref_num}', 
+
+                on_click=manipular_exclusao,
+                args=(id_card, conteudo_selecionado, ref_num), 
+                type="primary"
             )
 
-            st.divider()
+    rascunho.pop((conteudo_selecionado, ref_num), None)
+
+
+
+
+@st.fragment
+def painel_conteudo(id_card, conteudo_selecionado, time_responsavel_sessao):
+    with metricas.fase("renderizacao"):
+        _painel_conteudo(id_card, conteudo_selecionado, time_responsavel_sessao)
+
+
+def _painel_conteudo(id_card, conteudo_selecionado, time_responsavel_sessao):
+    exibir_avisos()
+    num_refacoes = st.session_state.estado_card.contagem(conteudo_selecionado)
+
+    st.button(
+        f"Adicionar Refação",
+        key = f'ADD_GLOBAL_{id_card}_{conteudo_selecionado}',
+        on_click=adicionar_refacao_callback,
+        args=(conteudo_selecionado,)
+    )
+
+    st.divider()
+
+    for ref_num in range(1, num_refacoes + 1):
+        painel_refacao(id_card, conteudo_selecionado, ref_num, time_responsavel_sessao)
+
+
+
+@st.fragment(run_every=INTERVALO_TEMPO_REAL)
+def monitor_atualizacoes():
+    assinatura = st.session_state.get('assinatura_tempo_real')
+    if assinatura is not None and assinatura.eventos or escritas_concluidas():
+        st.rerun()
+
+
+
+@st.fragment
+def barra_salvar(id_card, titulo, conteudo_selecionado, time_responsavel_sessao):
+    if st.button("Salvar no Banco de Dados", key=f'salvar-{id_card}'):
+        estado = st.session_state.estado_card
+        alteracoes = []
+        for ref_num in range(1, estado.contagem(conteudo_selecionado) + 1):
+            refacao = coletar_refacao(id_card, conteudo_selecionado, ref_num, time_responsavel_sessao)
+            if refacao != estado.obter(conteudo_selecionado, ref_num):
+                alteracoes.append(refacao)
+
+        conflitos = st.session_state.conflitos_tempo_real
+        bloqueadas = [r for r in alteracoes if (r.numero_conteudo, r.numero_refacao) in conflitos]
+        if bloqueadas:
+            st.warning(f"{len(bloqueadas)} refações com conflito não foram salvas. Resolva o conflito e salve novamente.")
+            alteracoes = [r for r in alteracoes if (r.numero_conteudo, r.numero_refacao) not in conflitos]
+
+        if not alteracoes:
+            st.info("Nenhuma alteração para salvar.")
+            return
+
+        try:
+            with metricas.fase("salvar"):
+                desatualizadas = salvar_alteracoes(id_card, titulo, alteracoes)
+        except Exception as e:
+            st.error(f"Ocorreu um erro na operação com o banco: {e}")
+            return
+
+        salvas = len(alteracoes) - len(desatualizadas)
+        if escrita_assincrona():
+            adicionar_aviso(f"{salvas} refações enfileiradas para envio.", "⏳")
+            st.rerun()
+        if not desatualizadas:
+            st.success(f"{salvas} refações enviadas com sucesso!")
+            return
+
+        conflitos.update(desatualizadas)
+        if salvas:
+            adicionar_aviso(f"{salvas} refações enviadas com sucesso!", "✅")
+        lista = ", ".join(f"{ref}ª do conteúdo {cont}" for cont, ref in desatualizadas)
+        adicionar_aviso(f"Refações alteradas por outra pessoa e não salvas: {lista}. Revise e salve novamente.", "⚠️")
+        st.rerun()
+
+
 
 
-            for ref_num in range(1, num_refacoes + 1):
-                
-                dados_existentes = next(
-                    (r for r in st.session_state.tem_card_refacao_data 
-                     if r.get("numero_conteudo") == conteudo_selecionado and r.get("numero_refacao") == ref_num), 
-                    None 
+def registrar_edicoes_grade(chave_editor, df):
+    rejeitadas = grade.mesclar_edicoes(st.session_state.edicoes_grade, df, st.session_state[chave_editor]["edited_rows"])
+    for (cont_num, ref_num), campo, tipo in rejeitadas:
+        adicionar_aviso(
+            f"{grade.ROTULOS[campo]} não se aplica a refações {tipo}: alteração da {ref_num}ª refação "
+            f"do conteúdo {cont_num} descartada.", "⚠️"
+        )
+    st.session_state.revisao_grade += 1
+
+
+
+@st.fragment
+def grade_card(id_card, titulo):
+    exibir_avisos()
+    estado = st.session_state.estado_card
+    edicoes = st.session_state.edicoes_grade
+    grade.podar(estado, edicoes, {(cont, ref) for card, cont, ref in st.session_state.escritas_pendentes if card == id_card})
+
+    paginas = grade.paginas(estado)
+    if not paginas:
+        st.info("Card encontrado, nenhuma refação registrada.")
+        return
+
+    pagina = 1
+    if len(paginas) > 1:
+        pagina = st.number_input('Página', 1, len(paginas), key=f'pagina-grade-{id_card}')
+    conteudos = paginas[pagina - 1]
+    st.caption(f"Conteúdos {conteudos[0]} a {conteudos[-1]} de {estado.ultimo_conteudo()}")
+
+    df = grade.quadro(estado, conteudos, edicoes)
+    chave_editor = f'grade-{id_card}-{pagina}-{st.session_state.revisao_grade}'
+    st.data_editor(
+        df,
+        key=chave_editor,
+        hide_index=True,
+        column_config=grade.configuracao_colunas(carregar_catalogo(), df),
+        on_change=registrar_edicoes_grade,
+        args=(chave_editor, df)
+    )
+
+    alteracoes = grade.alteracoes(estado, edicoes)
+    if st.button(f"Salvar {len(alteracoes)} alterações", key=f'salvar-grade-{id_card}', disabled=not alteracoes):
+        try:
+            with metricas.fase("salvar"):
+                desatualizadas = salvar_alteracoes(id_card, titulo, alteracoes)
+        except Exception as e:
+            st.error(f"Ocorreu um erro na operação com o banco: {e}")
+            return
+
+        for refacao in alteracoes:
+            limpar_widgets_refacao(id_card, refacao.numero_conteudo, refacao.numero_refacao)
+        st.session_state.revisao_grade += 1
+
+        salvas = len(alteracoes) - len(desatualizadas)
+        if escrita_assincrona():
+            adicionar_aviso(f"{salvas} refações enfileiradas para envio.", "⏳")
+        elif salvas:
+            adicionar_aviso(f"{salvas} refações enviadas com sucesso!", "✅")
+        if desatualizadas:
+            lista = ", ".join(f"{ref}ª do conteúdo {cont}" for cont, ref in desatualizadas)
+            adicionar_aviso(f"Refações alteradas por outra pessoa e não salvas: {lista}. Revise e salve novamente.", "⚠️")
+        st.rerun()
+
+
+
+def procurar_card_novo(titulo, indice_titulos):
+    card = metricas.repositorio().carregar_card(titulo)
+    if card is None:
+        return indice_titulos
+    carregar_indice_titulos.clear()
+    return {**indice_titulos, titulo: card[0]}
+
+
+
+def resolver_card(busca_servidor):
+    indice_titulos = {}
+    if busca_servidor:
+        termo_busca = st.text_input('Buscar card:', key='termo_busca_card').strip()
+        nome_card_refacao = None
+        if termo_busca:
+            try:
+                indice_titulos = precarregar(lambda: buscar_titulos(termo_busca))
+            except Exception as e:
+                st.error(f"Erro ao buscar cards: {e}")
+            if indice_titulos:
+                nome_card_refacao = st.selectbox(
+                    'Nome card:', list(indice_titulos),
+                    key='nome_card_busca'
                 )
+            else:
+                st.warning("Nenhum card encontrado para a busca")
+    else:
+        nome_card_refacao = st.text_input(
+            'Nome card:', 
+            key='nome_card_selecionado'
+        )
+        if nome_card_refacao:
+            try:
+                indice_titulos = precarregar(carregar_indice_titulos)
+                if nome_card_refacao not in indice_titulos:
+                    indice_titulos = procurar_card_novo(nome_card_refacao, indice_titulos)
+            except Exception as e:
+                st.error(f"Erro ao carregar títulos dos cards: {e}")
+    return nome_card_refacao, indice_titulos
 
-                tag_time = ""
-                time_da_refacao = None
 
-                if dados_existentes and dados_existentes.get("time_responsavel"):
-                    time_da_refacao = dados_existentes['time_responsavel']
 
-                else:
-                    time_da_refacao = time_responsavel_sessao
-
-                if time_da_refacao == "Criação":
-                    tag_time = "🎨 [Criação]"
-                elif time_da_refacao == "Redação":
-                    tag_time = "✍️ [Redação]"
-
-                with st.expander(f"#### {ref_num}ª Refação {tag_time}", expanded=True):
-                    
-                    col1, col2, col3 = st.columns(3) 
-                    
-
-                    with col1:
-                        opcoes_tipo = [' ', 'Externa', 'Interna']
-                        key_tipo = f'tipo-{id_card}-{conteudo_selecionado}-{ref_num}'
-                        valor_atual = st.session_state.get(key_tipo, None)
-                        
-                        idx_tipo = 0
-                        if valor_atual:
-                            try: idx_tipo = opcoes_tipo.index(valor_atual)
-                            except ValueError: idx_tipo = 0
-                        elif dados_existentes and dados_existentes.get("tipo_refacao") in opcoes_tipo:
-                            idx_tipo = opcoes_tipo.index(dados_existentes["tipo_refacao"])
-                        
-                        st.selectbox(
-                            'Tipo Refação', opcoes_tipo,
-                            key=key_tipo, 
-                            index=idx_tipo
-                        )
-            
+def main():
+    st.sidebar.markdown("## Refação")
+    time_responsavel_sessao = st.sidebar.selectbox('Time', ('Criação', 'Redação'), key='time_sessao_atual') 
+    st.markdown(f'## Refação {time_responsavel_sessao}')
 
-                    with col2:
-                        
-
-                        if time_responsavel_sessao == "Redação":
-                            texto_bruto = texto_de_ajuda()
-                            linhas = texto_bruto.strip().split('\n')
-                            opcoes_redacao = [l.strip().lstrip('- **').split('**:')[0].strip() for l in linhas if l.strip()]
-                            opcoes_motivo = [" "] + opcoes_redacao
-                        
-                        else: 
-                            opcoes_motivo = [
-                                " ", "Briefing incompleto", "Execução fora do direcionamento", 
-                                "Erro técnico (para alterações de erro interno, ex: logo errada, cor errada)", 
-                                "Alteração estética (solicitada pelo cliente)", 
-                                "Alteração estética (solicitada pelo time)", 
-                                "Ajuste por atualização de informações"
-                            ]
-                        
-
-                        key_motivo = f'motivo-{id_card}-{conteudo_selecionado}-{ref_num}'
-                        idx_motivo = 0
-                        
-                        
-                        valor_a_exibir = None
-                        
-                        
-                        if dados_existentes and dados_existentes.get("motivo_refacao"):
-                            valor_a_exibir = dados_existentes["motivo_refacao"].strip()
-                       
-                        else:
-                            valor_sessao = st.session_state.get(key_motivo, None)
-                            if valor_sessao:
-                                valor_a_exibir = valor_sessao.strip()
-
-                        if valor_a_exibir and (valor_a_exibir not in opcoes_motivo):
-                            opcoes_motivo.append(valor_a_exibir)
-
-                        if valor_a_exibir:
-                            try:
-                                idx_motivo = opcoes_motivo.index(valor_a_exibir)
-                            except ValueError:
-                                idx_motivo = 0 
-                        
-                        motivo_refacao = st.selectbox(
-                            'Motivo Refação', 
-                            opcoes_motivo,
-                            key=key_motivo,
-                            index=idx_motivo
-                        )
-
-                        
-                       
-                    with col3:
-                        time_solicitou_refacao = None
-                        cliente_solicitou_refacao = None
-
-                        key_da_col1 = f'tipo-{id_card}-{conteudo_selecionado}-{ref_num}'
-                        valor_real_da_col1 = st.session_state.get(key_da_col1, ' ') 
-                    
-                        if valor_real_da_col1 == 'Interna': 
-                            time_opcoes = [' ', 'Redação', 'Criação', 'Automação', 'Tech', 'Performance', 'Comunicação', 'Produção', 'Organização']
-                            key_time = f'time-{id_card}-{conteudo_selecionado}-{ref_num}'
-                            valor_time = st.session_state.get(key_time, None)
-
-                            idx_time = 0
-                            if valor_time:
-                                try: idx_time = time_opcoes.index(valor_time)
-                                except ValueError: idx_time = 0
-                            elif dados_existentes and dados_existentes.get("time_solicitou_refacao") in time_opcoes:
-                                idx_time = time_opcoes.index(dados_existentes["time_solicitou_refacao"])
-
-                            time_solicitou_refacao = st.selectbox(
-                                'Time que solicitou:', time_opcoes, 
-                                key=key_time,
-                                index=idx_time
-                            )
-                        elif valor_real_da_col1 == 'Externa':
-                            cliente_opcoes = [
-                                ' ',
-                                'Hospitalar',
-                                'BR Consórcios',
-                                'SnowDog',
-                                'Arnaldos',
-                                'Acomac',
-                                'Alternativa RH',
-                                'Bayer WiSE',
-                                'BitFix',
-                                'Dale Carnegie',
-                                'EletroFM',
-                                'Gustavo Campassi',
-                                'Hospital Evangélico',
-                                'Marly Fagundes',
-                                'Massi Marketing',
-                                'Massi Auto',
-                                'Parque das Oliveiras',
-                                'Abralimp',
-                                'Amiste Café',
-                                'Amiste Franquia',
-                                'Amiste Unidades',
-                                'Ambiente Home',
-                                'Claven',
-                                'CondoBem',
-                                'Dr. Mitsuo',
-                                'Fancar Fiat',
-                                'Fancar Renault',
-                                'Fancar Ford',
-                                'Fancar Volkswagen',
-                                'Fancar Honda',
-                                'Fancar Seminovos',
-                                'Fancor',
-                                'Manda Bem',
-                                'Norpave e Cipasa Seminovos',
-                                'Rocha Supermercado',
-                                'Só Películas',
-                                'SolvePlan',
-                                'Santarém',
-                                'Fancar Consórcios',
-                                'Norpave e Cipasa Novos',
-                                'Unidos',
-                                'Metanet',
-                                'State Offices',
-                                'Clavem',
-                                'Paella Solidaria',
-                                'Garcia Piscinas',
-                                'Temperbras'
-                            ]
-
-                            key_cliente = f'cliente-{id_card}-{conteudo_selecionado}-{ref_num}'
-                            valor_cliente = st.session_state.get(key_cliente, None)
-
-                            idx_cliente = 0
-                            if valor_cliente:
-                                try: idx_cliente = cliente_opcoes.index(valor_cliente)
-                                except ValueError: idx_cliente = 0
-                            elif dados_existentes and dados_existentes.get("cliente_solicitou_refacao") in cliente_opcoes:
-                                idx_cliente = cliente_opcoes.index(dados_existentes["cliente_solicitou_refacao"])
-
-                            cliente_solicitou_refacao = st.selectbox(
-                                'Cliente que solicitou:', cliente_opcoes, 
-                                key=key_cliente,
-                                index=idx_cliente
-                            )
-                        else:
-                            st.selectbox(
-                                'Time/Cliente',
-                                ['Selecione um Tipo de Refação'],
-                                disabled=True,
-                                key=f'placeholder-{id_card}-{conteudo_selecionado}-{ref_num}'
-                            )
-        
-                    
-                    _, col_btn_apagar = st.columns([4, 1]) 
-                    
-                    with col_btn_apagar:
-                        st.button(
-                            "Excluir",
-                            key=f'DELETE_GLOBAL-{id_card}-{conteudo_selecionado}-{ref_num}', 
-
-                            on_click=manipular_exclusao,
-                            args=(id_card, conteudo_selecionado, ref_num, bool(dados_existentes)), 
-                            type="primary"
-                        )
-
-                    
-                    dados_coletados = {
-                        "id_trello_card": id_card,
-                        "titulo": nome_card_refacao,
-                        "numero_conteudo": conteudo_selecionado,
-                        "numero_refacao": ref_num,  
-                        "tipo_refacao": valor_real_da_col1, 
-                        "motivo_refacao": motivo_refacao,
-                        "time_solicitou_refacao": time_solicitou_refacao,
-                        "cliente_solicitou_refacao": cliente_solicitou_refacao,
-                        "time_responsavel": time_da_refacao
-                    }
-                    if dados_existentes:
-                        dados_para_atualizar.append(dados_coletados)
-                    else:
-                        dados_para_inserir.append(dados_coletados)
+    id_card = None 
 
-       
-        pode_salvar = bool(dados_para_atualizar or dados_para_inserir)
-        
-        if pode_salvar:
-            if st.button(f"Salvar no Banco de Dados", key=f'salvar-{id_card}'):
-                try:
-                    
-                    if dados_para_atualizar:
-                        response_update = supabase.table("cards_refacao").upsert(
-                            dados_para_atualizar, 
-                            on_conflict="id_trello_card,numero_conteudo,numero_refacao" 
-                        ).execute()
-                        if hasattr(response_update, 'error') and response_update.error:
-                            raise Exception(f"Erro ao ATUALIZAR: {response_update.error['message']}")
-
-                  
-                    if dados_para_inserir:
-                        response_insert = supabase.table("cards_refacao").insert(
-                            dados_para_inserir
-                        ).execute()
-                        if hasattr(response_insert, 'error') and response_insert.error:
-                            raise Exception(f"Erro ao INSERIR: {response_insert.error['message']}")
-
-
-                    st.success("Dados enviados com sucesso!")
-                    sincronizar_dados(id_card)
-                    st.rerun()
-
-                except Exception as e:
-                    if "duplicate key value violates unique constraint" in str(e):
-                        st.warning("Ops! Alguém salvou uma refação ao mesmo tempo. Estamos atualizando sua tela. Verifique seus dados e salve novamente.")
-                        sincronizar_dados(id_card)
-                        st.rerun()
+
+
+    if 'estado_card' not in st.session_state:
+        st.session_state.estado_card = EstadoCard()
+
+    if 'conflitos_tempo_real' not in st.session_state:
+        st.session_state.conflitos_tempo_real = set()
+
+    if 'escritas_pendentes' not in st.session_state:
+        st.session_state.escritas_pendentes = set()
+
+    if 'edicoes_grade' not in st.session_state:
+        st.session_state.edicoes_grade = {}
+        st.session_state.revisao_grade = 0
+
+    with st.container():
+        st.markdown('### Dados da Refação')
+
+
+        busca_servidor = st.sidebar.toggle('Buscar card no servidor', key='busca_servidor')
+        visao_geral = st.sidebar.toggle('Visão geral do card', key='visao_geral')
+        st.sidebar.button('Atualizar lista de cards', key='atualizar_titulos', on_click=invalidar_titulos)
+        st.sidebar.button('Atualizar opções', key='atualizar_catalogo', on_click=invalidar_catalogo)
+
+        with metricas.fase("resolucao_card"):
+            nome_card_refacao, indice_titulos = resolver_card(busca_servidor)
+
+      
+        if nome_card_refacao:   
+            if nome_card_refacao not in indice_titulos:
+                st.warning("O card não foi encontrado")
+                fechar_card(time_responsavel_sessao)
+            else:
+                id_card = indice_titulos[nome_card_refacao]
+                if id_card and st.session_state.estado_card.card_id != id_card:
+                    with metricas.fase("carga"):
+                        encontrado = abrir_card(nome_card_refacao, id_card, time_responsavel_sessao)
+
+                    if not encontrado:
+                        id_card = None
+                    elif st.session_state.estado_card:
+                        st.info(f"{len(st.session_state.estado_card)} registros de refação encontrados.")
                     else:
-                        st.error(f"Ocorreu um erro na operação com o banco: {e}")
+                        st.info("Card encontrado, nenhuma refação registrada.")
+
+                if id_card:
+                    st.success("Card carregado.")
+                else:
+                    st.error("Card não encontrado no banco.")
+                    fechar_card(time_responsavel_sessao)
+        if id_card:
+            aplicar_escritas_concluidas(id_card)
+            aplicar_eventos_tempo_real(id_card, time_responsavel_sessao)
+            assinatura = st.session_state.get('assinatura_tempo_real')
+            if (assinatura is not None and tempo_real.disponivel()) or st.session_state.escritas_pendentes:
+                monitor_atualizacoes()
+            if tempo_real.status():
+                st.sidebar.caption(f"Tempo real: {tempo_real.status()}")
+
+            if visao_geral:
+                st.markdown("### Todas as refações do card")
+                grade_card(id_card, nome_card_refacao)
+            else:
+                chave_slider = f'slider-conteudo-{id_card}'
+                max_conteudo = max(st.session_state.estado_card.ultimo_conteudo() + 1, CONTEUDOS_PADRAO)
+                if st.session_state.get(chave_slider, 1) > max_conteudo:
+                    st.session_state[chave_slider] = max_conteudo
+                conteudo_selecionado = st.slider(
+                    'Selecione o Conteúdo:', 1, max_conteudo,
+                    key=chave_slider
+                )
+                st.markdown(f"### Refações para o {conteudo_selecionado}° Conteúdo")
+
+                painel_conteudo(id_card, conteudo_selecionado, time_responsavel_sessao)
+                barra_salvar(id_card, nome_card_refacao, conteudo_selecionado, time_responsavel_sessao)
         else:
             st.info("Adicione ao menos uma refação para salvar.")
 
+    if metricas.depuracao_ativa():
+        metricas.painel_depuracao()
+    perfil.painel()
+
 
 
    
             
 if __name__ == "__main__":
-    main()  
\ No newline at end of file
+    with metricas.fase("rerun"):
+        main()
+    perfil.marcar("primeira_pintura", inicio_execucao)
@@ -0,0 +1,300 @@
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import sessao
+from conexao import configuracao_ativa
+
+
+LIMITE_MEDICOES_SESSAO = 200
+MAIORES_CHAVES_SESSAO = 5
+PREFIXO_PROMETHEUS = "refacao"
+
+logger = logging.getLogger("refacao.metricas")
+
+_ARQUIVOS_IGNORADOS = {
+    os.path.abspath(__file__),
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "repositorio.py")),
+    os.path.abspath(contextlib.__file__),
+}
+
+
+@dataclass(slots=True)
+class Medicao:
+    tipo: str
+    nome: str
+    origem: str
+    duracao_ms: float
+    linhas: int = 0
+    bytes_recebidos: int = 0
+    bytes_enviados: int = 0
+    erro: str = None
+
+
+class _Agregado:
+    __slots__ = ("execucoes", "segundos", "linhas", "bytes_recebidos", "bytes_enviados", "erros")
+
+    def __init__(self):
+        self.execucoes = 0
+        self.segundos = 0.0
+        self.linhas = 0
+        self.bytes_recebidos = 0
+        self.bytes_enviados = 0
+        self.erros = 0
+
+
+class Coletor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agregados = {}
+
+    def registrar(self, medicao):
+        chave = (medicao.tipo, medicao.nome, medicao.origem)
+        with self._lock:
+            agregado = self._agregados.get(chave)
+            if agregado is None:
+                agregado = self._agregados[chave] = _Agregado()
+            agregado.execucoes += 1
+            agregado.segundos += medicao.duracao_ms / 1000
+            agregado.linhas += medicao.linhas
+            agregado.bytes_recebidos += medicao.bytes_recebidos
+            agregado.bytes_enviados += medicao.bytes_enviados
+            agregado.erros += medicao.erro is not None
+
+    def prometheus(self):
+        with self._lock:
+            itens = sorted(self._agregados.items())
+
+        metricas = (
+            ("execucoes", "counter", "Quantidade de execuções."),
+            ("segundos", "counter", "Tempo total em segundos."),
+            ("linhas", "counter", "Linhas retornadas pelo banco."),
+            ("bytes_recebidos", "counter", "Bytes JSON recebidos do banco (só com depuração ou log de métricas)."),
+            ("bytes_enviados", "counter", "Bytes JSON enviados ao banco (só com depuração ou log de métricas)."),
+            ("erros", "counter", "Execuções que terminaram em erro."),
+        )
+        saida = []
+        for atributo, tipo_metrica, ajuda in metricas:
+            for tipo in ("consulta", "fase"):
+                if tipo == "fase" and atributo not in ("execucoes", "segundos", "erros"):
+                    continue
+                nome = f"{PREFIXO_PROMETHEUS}_{tipo}_{atributo}_total"
+                saida.append(f"# HELP {nome} {ajuda}")
+                saida.append(f"# TYPE {nome} {tipo_metrica}")
+                for (tipo_item, nome_item, origem), agregado in itens:
+                    if tipo_item == tipo:
+                        rotulos = f'nome="{_escapar(nome_item)}",origem="{_escapar(origem)}"'
+                        saida.append(f"{nome}{{{rotulos}}} {getattr(agregado, atributo)}")
+        return "\n".join(saida) + "\n"
+
+    def limpar(self):
+        with self._lock:
+            self._agregados.clear()
+
+
+coletor = Coletor()
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_logs_configurados = False
+
+
+def _log_ativo():
+    global _logs_configurados
+    if not _logs_configurados:
+        _configurar_logs()
+        _logs_configurados = True
+    return logger.isEnabledFor(logging.INFO)
+
+
+def _configurar_logs():
+    if configuracao_ativa("log_metricas") and not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def origem_chamada():
+    quadro = sys._getframe(1)
+    while quadro is not None and os.path.abspath(quadro.f_code.co_filename) in _ARQUIVOS_IGNORADOS:
+        quadro = quadro.f_back
+    if quadro is None:
+        return "desconhecida"
+    modulo = os.path.splitext(os.path.basename(quadro.f_code.co_filename))[0]
+    return f"{modulo}.{quadro.f_code.co_name}"
+
+
+def _tamanho_json(dados):
+    if dados is None:
+        return 0
+    try:
+        return len(json.dumps(dados, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _medir_tamanhos():
+    if _log_ativo():
+        return True
+    return get_script_run_ctx(suppress_warning=True) is not None and depuracao_ativa()
+
+
+def _contar_linhas(dados):
+    if isinstance(dados, (list, dict)):
+        return len(dados)
+    if isinstance(dados, tuple):
+        return sum(_contar_linhas(item) for item in dados if isinstance(item, (list, dict)))
+    return int(dados is not None)
+
+
+def _medicoes_sessao():
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    if "medicoes" not in st.session_state:
+        st.session_state.medicoes = deque(maxlen=LIMITE_MEDICOES_SESSAO)
+    return st.session_state.medicoes
+
+
+def registrar(medicao):
+    coletor.registrar(medicao)
+    medicoes = _medicoes_sessao()
+    if medicoes is not None:
+        medicoes.append(medicao)
+    if _log_ativo():
+        logger.info(json.dumps(dict(asdict(medicao), evento="medicao"), ensure_ascii=False))
+
+
+@contextlib.contextmanager
+def fase(nome):
+    origem = origem_chamada()
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        yield
+    except Exception as e:
+        erro = type(e).__name__
+        raise
+    finally:
+        registrar(Medicao("fase", nome, origem, (time.perf_counter() - inicio) * 1000, erro=erro))
+
+
+def medir_consulta(nome, funcao, *args, origem=None, **kwargs):
+    origem = origem or origem_chamada()
+    inicio = time.perf_counter()
+    try:
+        resultado = funcao(*args, **kwargs)
+    except Exception as e:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        enviados = _tamanho_json(args or None) if _medir_tamanhos() else 0
+        registrar(Medicao("consulta", nome, origem, duracao_ms, bytes_enviados=enviados, erro=type(e).__name__))
+        raise
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    dados = getattr(resultado, "data", resultado)
+    medicao = Medicao("consulta", nome, origem, duracao_ms, linhas=_contar_linhas(dados))
+    if _medir_tamanhos():
+        medicao.bytes_recebidos = _tamanho_json(dados)
+        medicao.bytes_enviados = _tamanho_json(args or None)
+    registrar(medicao)
+    return resultado
+
+
+def executar(consulta, nome):
+    return medir_consulta(nome, consulta.execute, origem=origem_chamada())
+
+
+class RepositorioInstrumentado:
+    def __init__(self, repositorio):
+        self._repositorio = repositorio
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._repositorio, nome)
+        if not callable(atributo) or nome.startswith("_"):
+            return atributo
+
+        def chamada(*args, **kwargs):
+            return medir_consulta(nome, atributo, *args, origem=origem_chamada(), **kwargs)
+        return chamada
+
+
+def repositorio():
+    from repositorio import obter_repositorio
+
+    return RepositorioInstrumentado(obter_repositorio())
+
+
+def resumo_sessao():
+    medicoes = _medicoes_sessao() or ()
+    resumo = {}
+    for medicao in medicoes:
+        chave = (medicao.tipo, medicao.nome, medicao.origem)
+        item = resumo.setdefault(chave, {
+            "tipo": medicao.tipo, "nome": medicao.nome, "origem": medicao.origem,
+            "execucoes": 0, "total_ms": 0.0, "max_ms": 0.0, "linhas": 0, "bytes": 0, "erros": 0,
+        })
+        item["execucoes"] += 1
+        item["total_ms"] += medicao.duracao_ms
+        item["max_ms"] = max(item["max_ms"], medicao.duracao_ms)
+        item["linhas"] += medicao.linhas
+        item["bytes"] += medicao.bytes_recebidos + medicao.bytes_enviados
+        item["erros"] += medicao.erro is not None
+    return sorted(resumo.values(), key=lambda item: item["total_ms"], reverse=True)
+
+
+def depuracao_ativa():
+    return configuracao_ativa("depuracao") or st.query_params.get("depuracao") == "1"
+
+
+def painel_depuracao():
+    with st.sidebar.expander("Depuração", expanded=False):
+        chaves, total, por_chave = sessao.memoria_sessao()
+        st.caption(
+            f"Sessão: {chaves} chaves, ~{total / 1024:.1f} KiB, "
+            f"rascunhos de {len(st.session_state.get('rascunhos', ()))} cards"
+        )
+        maiores = sorted(por_chave.items(), key=lambda item: item[1], reverse=True)[:MAIORES_CHAVES_SESSAO]
+        st.dataframe([{"chave": chave, "KiB": round(tamanho / 1024, 1)} for chave, tamanho in maiores], hide_index=True)
+
+        medicoes = list(_medicoes_sessao() or ())
+        ultimas = medicoes[-1:-16:-1]
+        st.caption(f"Últimas {len(ultimas)} de {len(medicoes)} medições desta sessão")
+        st.dataframe(
+            [{"tipo": m.tipo, "nome": m.nome, "origem": m.origem, "ms": round(m.duracao_ms, 1),
+              "linhas": m.linhas, "bytes": m.bytes_recebidos + m.bytes_enviados} for m in ultimas],
+            hide_index=True,
+        )
+
+        resumo = resumo_sessao()
+        repetidas = [r for r in resumo if r["tipo"] == "consulta" and r["execucoes"] > 1]
+        if repetidas:
+            st.caption("Consultas repetidas por origem")
+            st.dataframe(
+                [{"nome": r["nome"], "origem": r["origem"], "execucoes": r["execucoes"]} for r in repetidas],
+                hide_index=True,
+            )
+
+        col_prometheus, col_json, col_limpar = st.columns(3)
+        col_prometheus.download_button(
+            "Prometheus", coletor.prometheus(), file_name="metricas.prom", mime="text/plain",
+            key="depuracao_prometheus", on_click="ignore"
+        )
+        col_json.download_button(
+            "JSON", "\n".join(json.dumps(asdict(m), ensure_ascii=False) for m in medicoes),
+            file_name="medicoes.jsonl", mime="application/x-ndjson",
+            key="depuracao_json", on_click="ignore"
+        )
+        if col_limpar.button("Limpar", key="depuracao_limpar"):
+            st.session_state.medicoes.clear()
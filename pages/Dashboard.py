@@ -0,0 +1,61 @@
+import datetime
+
+import streamlit as st
+
+from autenticacao import check_password
+
+
+check_password()
+
+from analise import DIMENSOES, GRANULARIDADES, resumo_refacoes, tendencia, totais_por_valor
+
+st.markdown("## Dashboard de Refações")
+
+hoje = datetime.date.today()
+col1, col2, col3 = st.columns(3)
+with col1:
+    dimensao = st.selectbox(
+        'Agrupar por', list(DIMENSOES),
+        format_func=DIMENSOES.get,
+        key='dashboard_dimensao'
+    )
+with col2:
+    periodo = st.date_input(
+        'Período', (hoje - datetime.timedelta(days=180), hoje),
+        key='dashboard_periodo'
+    )
+with col3:
+    granularidade = st.selectbox(
+        'Granularidade', list(GRANULARIDADES),
+        index=list(GRANULARIDADES).index("month"),
+        format_func=GRANULARIDADES.get,
+        key='dashboard_granularidade'
+    )
+
+if len(periodo) != 2:
+    st.info("Selecione a data inicial e final.")
+    st.stop()
+
+inicio, fim = periodo
+
+try:
+    resumo = resumo_refacoes(dimensao, inicio, fim, granularidade)
+except Exception as e:
+    st.error(f"Erro ao carregar o resumo de refações: {e}")
+    st.stop()
+
+if resumo.empty:
+    st.info("Nenhuma refação registrada no período.")
+    st.stop()
+
+totais = totais_por_valor(resumo)
+st.metric("Refações no período", int(totais.sum()))
+
+st.markdown(f"### Por {DIMENSOES[dimensao].lower()}")
+st.bar_chart(totais.astype("int64"), horizontal=True)
+
+st.markdown("### Tendência")
+st.line_chart(tendencia(resumo).astype("int64"))
+
+with st.expander("Dados agregados"):
+    st.dataframe(resumo, hide_index=True, width='stretch')
@@ -0,0 +1,137 @@
+import streamlit as st
+
+from autenticacao import check_password
+
+
+check_password()
+
+import lote
+import metricas
+from catalogo import carregar_catalogo
+from conexao import configuracao_ativa
+from grade import motivos, mudancas_normalizadas
+from titulos import carregar_indice_titulos
+
+st.markdown("## Edição em lote")
+
+
+def recarregar():
+    st.session_state.lote_carregado = None
+    for chave in ('lote_tabela', 'lote_conteudos', 'lote_confirmar_exclusao'):
+        st.session_state.pop(chave, None)
+
+
+def avisar(mensagem, icone):
+    st.session_state.setdefault('lote_avisos', []).append((mensagem, icone))
+
+
+def definir_campos(selecionadas, mudancas):
+    try:
+        if configuracao_ativa("escrita_versionada"):
+            linhas = lote.linhas_atualizadas(selecionadas, mudancas)
+            resultados = metricas.repositorio().salvar_refacoes_versionadas(linhas)
+            conflitos = sum(resultado["status"] == "conflito" for resultado in resultados)
+        else:
+            metricas.repositorio().atualizar_refacoes(lote.chaves(selecionadas), mudancas_normalizadas(mudancas))
+            conflitos = 0
+    except Exception as e:
+        st.error(f"Ocorreu um erro na operação com o banco: {e}")
+        return
+
+    avisar(f"{len(selecionadas) - conflitos} refações atualizadas.", "✅")
+    if conflitos:
+        avisar(f"{conflitos} refações foram alteradas por outra pessoa e não foram atualizadas.", "⚠️")
+    recarregar()
+    st.rerun()
+
+
+def excluir(selecionadas):
+    try:
+        if configuracao_ativa("escrita_versionada"):
+            excluidas = metricas.repositorio().excluir_refacoes_versionadas(lote.chaves_versionadas(selecionadas))
+        else:
+            metricas.repositorio().excluir_refacoes(lote.chaves(selecionadas))
+            excluidas = len(selecionadas)
+    except Exception as e:
+        st.error(f"Erro ao excluir as refações do banco: {e}")
+        return
+
+    avisar(f"{excluidas} refações excluídas.", "✅")
+    if excluidas < len(selecionadas):
+        avisar(f"{len(selecionadas) - excluidas} refações foram alteradas por outra pessoa e não foram excluídas.", "⚠️")
+    recarregar()
+    st.rerun()
+
+
+for mensagem, icone in st.session_state.pop('lote_avisos', []):
+    st.toast(mensagem, icon=icone)
+
+try:
+    indice_titulos = carregar_indice_titulos()
+except Exception as e:
+    st.error(f"Erro ao carregar títulos dos cards: {e}")
+    st.stop()
+
+titulos = st.multiselect('Cards', sorted(indice_titulos), key='lote_cards', on_change=recarregar)
+if not titulos:
+    st.info("Selecione um ou mais cards.")
+    st.stop()
+
+card_ids = tuple(indice_titulos[titulo] for titulo in titulos)
+if st.session_state.get('lote_carregado') != card_ids:
+    try:
+        st.session_state.lote_linhas = metricas.repositorio().carregar_refacoes_cards(card_ids)
+    except Exception as e:
+        st.error(f"Erro ao carregar as refações: {e}")
+        st.stop()
+    st.session_state.lote_carregado = card_ids
+
+df = lote.quadro(st.session_state.lote_linhas, {indice_titulos[titulo]: titulo for titulo in titulos})
+if df.empty:
+    st.info("Nenhuma refação registrada nos cards selecionados.")
+    st.stop()
+
+catalogo = carregar_catalogo()
+
+col1, col2 = st.columns(2)
+with col1:
+    minimo, maximo = int(df["numero_conteudo"].min()), int(df["numero_conteudo"].max())
+    conteudos = None
+    if minimo < maximo:
+        conteudos = st.slider('Conteúdos', minimo, maximo, (minimo, maximo), key='lote_conteudos')
+with col2:
+    tipos = st.multiselect('Tipo', catalogo.tipo.valores[1:], key='lote_tipos')
+
+filtrado = lote.filtrar(df, conteudos, tipos)
+evento = st.dataframe(
+    filtrado[list(lote.COLUNAS_LOTE)].rename(columns=lote.ROTULOS_LOTE),
+    hide_index=True,
+    width='stretch',
+    on_select="rerun",
+    selection_mode="multi-row",
+    key='lote_tabela'
+)
+
+todas = st.checkbox(f"Aplicar a todas as {len(filtrado)} refações filtradas", key='lote_todas')
+selecionadas = filtrado if todas else filtrado.iloc[evento.selection.rows]
+st.caption(f"{len(selecionadas)} refações selecionadas em {selecionadas['id_trello_card'].nunique()} cards")
+
+aba_motivo, aba_cliente, aba_excluir = st.tabs(["Motivo", "Cliente", "Excluir"])
+
+with aba_motivo:
+    motivo = st.selectbox('Motivo Refação', motivos(catalogo), key='lote_motivo')
+    if st.button("Definir motivo", key='lote_definir_motivo', disabled=selecionadas.empty):
+        definir_campos(selecionadas, {"motivo_refacao": motivo})
+
+with aba_cliente:
+    cliente = st.selectbox(
+        'Cliente que solicitou:', catalogo.cliente.valores, key='lote_cliente',
+        help="As refações selecionadas passam a ser do tipo Externa."
+    )
+    if st.button("Definir cliente", key='lote_definir_cliente', disabled=selecionadas.empty):
+        definir_campos(selecionadas, {"tipo_refacao": "Externa", "cliente_solicitou_refacao": cliente})
+
+with aba_excluir:
+    confirmar = st.checkbox(f"Confirmo a exclusão de {len(selecionadas)} refações", key='lote_confirmar_exclusao')
+    if st.button("Excluir selecionadas", key='lote_excluir', disabled=selecionadas.empty or not confirmar, type="primary"):
+        excluir(selecionadas)
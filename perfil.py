@@ -0,0 +1,105 @@
+import builtins
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from conexao import ambiente_ativo
+
+
+INICIO_CARGA = time.perf_counter()
+LIMITE_IMPORTACOES = 15
+LIMITE_SESSOES = 1000
+
+logger = logging.getLogger("refacao.perfil")
+
+_importacoes = []
+_marcos = {}
+_marcos_sessoes = OrderedDict()
+_local = threading.local()
+_import_original = None
+
+
+def ativo():
+    return ambiente_ativo("perfil_inicio")
+
+
+def _importar(nome, globais=None, locais=None, fromlist=(), nivel=0):
+    if nivel or nome in sys.modules:
+        return _import_original(nome, globais, locais, fromlist, nivel)
+
+    profundidade = getattr(_local, "profundidade", 0)
+    _local.profundidade = profundidade + 1
+    inicio = time.perf_counter()
+    try:
+        return _import_original(nome, globais, locais, fromlist, nivel)
+    finally:
+        _local.profundidade = profundidade
+        _importacoes.append((nome, profundidade, (time.perf_counter() - inicio) * 1000))
+
+
+def ativar():
+    global _import_original
+    if _import_original is None and ativo():
+        if not logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+        _import_original = builtins.__import__
+        builtins.__import__ = _importar
+
+
+def importacoes(limite=LIMITE_IMPORTACOES):
+    diretas = [item for item in _importacoes if item[1] == 0]
+    return sorted(diretas, key=lambda item: item[2], reverse=True)[:limite]
+
+
+def marcar(nome, inicio_execucao):
+    if _import_original is None:
+        return
+    contexto = get_script_run_ctx(suppress_warning=True)
+    if contexto is None:
+        return
+    marcos_sessao = _marcos_sessoes.setdefault(contexto.session_id, {})
+    _marcos_sessoes.move_to_end(contexto.session_id)
+    while len(_marcos_sessoes) > LIMITE_SESSOES:
+        _marcos_sessoes.popitem(last=False)
+    if nome in marcos_sessao:
+        return
+
+    agora = time.perf_counter()
+    marco = {
+        "execucao_ms": (agora - inicio_execucao) * 1000,
+        "desde_carga_ms": (agora - INICIO_CARGA) * 1000,
+        "primeira_sessao": nome not in _marcos,
+    }
+    _marcos.setdefault(nome, marco)
+    marcos_sessao[nome] = marco
+    logger.info(json.dumps({
+        "evento": "perfil_inicio",
+        "marco": nome,
+        **marco,
+        "importacoes": [{"modulo": modulo, "ms": round(ms, 1)} for modulo, _, ms in importacoes()],
+    }, ensure_ascii=False))
+
+
+def painel():
+    if _import_original is None:
+        return
+    with st.sidebar.expander("Perfil de inicialização", expanded=False):
+        contexto = get_script_run_ctx(suppress_warning=True)
+        for nome, marco in _marcos_sessoes.get(contexto.session_id, {}).items():
+            origem = "primeira sessão do processo" if marco["primeira_sessao"] else "processo aquecido"
+            st.caption(
+                f"{nome}: {marco['execucao_ms']:.0f} ms na execução, "
+                f"{marco['desde_carga_ms']:.0f} ms desde a carga do app ({origem})"
+            )
+        linhas = "\n".join(f"| {modulo} | {ms:.1f} |" for modulo, _, ms in importacoes())
+        st.markdown(f"| módulo | ms |\n|---|---:|\n{linhas}")
@@ -0,0 +1,388 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from itertools import groupby
+from urllib.parse import quote
+
+from conexao import configuracao, configuracao_ativa, obter_cliente
+from estado import CAMPOS_REFACAO, CHAVE_REFACAO, ON_CONFLICT_REFACAO
+
+
+class Repositorio(ABC):
+    @abstractmethod
+    def indice_titulos(self):
+        ...
+
+    @abstractmethod
+    def buscar_titulos(self, termo, limite):
+        ...
+
+    @abstractmethod
+    def carregar_card(self, titulo):
+        ...
+
+    @abstractmethod
+    def carregar_refacoes_cards(self, card_ids):
+        ...
+
+    @abstractmethod
+    def obter_refacao(self, card_id, cont_num, ref_num):
+        ...
+
+    @abstractmethod
+    def salvar_refacoes(self, linhas):
+        ...
+
+    @abstractmethod
+    def salvar_refacoes_versionadas(self, linhas):
+        ...
+
+    @abstractmethod
+    def excluir_refacao(self, card_id, cont_num, ref_num, versao=None):
+        ...
+
+    @abstractmethod
+    def excluir_refacoes(self, chaves):
+        ...
+
+    @abstractmethod
+    def excluir_refacoes_versionadas(self, chaves_versoes):
+        ...
+
+    @abstractmethod
+    def atualizar_refacoes(self, chaves, valores):
+        ...
+
+
+COLUNAS_LIDAS = ("id_trello_card",) + CAMPOS_REFACAO
+TAMANHO_PAGINA_LEITURA = 1000
+LIMITE_FILTRO_URL = 4000
+
+
+def _padrao_prefixo(termo):
+    return termo.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _filtro_chave(card_id, cont_num, ref_num):
+    return dict(zip(CHAVE_REFACAO, (card_id, cont_num, ref_num)))
+
+
+def valor_filtro(valor):
+    if isinstance(valor, str):
+        return '"' + valor.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return str(valor)
+
+
+def filtro_keyset(ultima_linha):
+    card, conteudo, refacao = (valor_filtro(ultima_linha[coluna]) for coluna in CHAVE_REFACAO)
+    return (
+        f"id_trello_card.gt.{card},"
+        f"and(id_trello_card.eq.{card},numero_conteudo.gt.{conteudo}),"
+        f"and(id_trello_card.eq.{card},numero_conteudo.eq.{conteudo},numero_refacao.gt.{refacao})"
+    )
+
+
+def _grupo_chave(chave):
+    card_id, cont_num, _, *versao = chave
+    return (card_id, cont_num, *versao)
+
+
+def _condicoes_chaves(chaves):
+    card, conteudo, refacao = CHAVE_REFACAO
+    ordenadas = sorted(chaves, key=lambda chave: (_grupo_chave(chave), chave[2]))
+    for (card_id, cont_num, *versao), grupo in groupby(ordenadas, key=_grupo_chave):
+        refacoes = ",".join(str(chave[2]) for chave in grupo)
+        filtro_versao = f",versao.eq.{versao[0]}" if versao else ""
+        yield f"and({card}.eq.{valor_filtro(card_id)},{conteudo}.eq.{cont_num},{refacao}.in.({refacoes}){filtro_versao})"
+
+
+def _filtros_chaves(chaves, limite=LIMITE_FILTRO_URL):
+    filtro, tamanho = [], 0
+    for condicao in _condicoes_chaves(chaves):
+        tamanho_condicao = len(quote(condicao, safe="")) + 3
+        if filtro and tamanho + tamanho_condicao > limite:
+            yield ",".join(filtro)
+            filtro, tamanho = [], 0
+        filtro.append(condicao)
+        tamanho += tamanho_condicao
+    if filtro:
+        yield ",".join(filtro)
+
+
+class RepositorioSupabase(Repositorio):
+    def __init__(self, cliente, com_versao=False):
+        self.cliente = cliente
+        self.colunas = ", ".join(COLUNAS_LIDAS + (("versao",) if com_versao else ()))
+
+    def indice_titulos(self):
+        response = self.cliente.table("cards").select("titulo, trello_card_id").execute()
+        return {item['titulo']: item['trello_card_id'] for item in response.data}
+
+    def buscar_titulos(self, termo, limite):
+        response = (
+            self.cliente.table("cards")
+            .select("titulo, trello_card_id")
+            .ilike("titulo", _padrao_prefixo(termo))
+            .order("titulo")
+            .limit(limite)
+            .execute()
+        )
+        return {item['titulo']: item['trello_card_id'] for item in response.data}
+
+    def carregar_card(self, titulo):
+        response = (
+            self.cliente.table("cards")
+            .select(f"trello_card_id, cards_refacao({self.colunas})")
+            .eq("titulo", titulo)
+            .limit(1)
+            .execute()
+        )
+        if not response.data:
+            return None
+        card = response.data[0]
+        return card["trello_card_id"], card["cards_refacao"] or []
+
+    def carregar_refacoes_cards(self, card_ids):
+        linhas = []
+        while True:
+            response = (
+                self.cliente.table("cards_refacao")
+                .select(self.colunas)
+                .in_("id_trello_card", list(card_ids))
+                .order("id_trello_card").order("numero_conteudo").order("numero_refacao")
+                .range(len(linhas), len(linhas) + TAMANHO_PAGINA_LEITURA - 1)
+                .execute()
+            )
+            linhas.extend(response.data)
+            if len(response.data) < TAMANHO_PAGINA_LEITURA:
+                return linhas
+
+    def obter_refacao(self, card_id, cont_num, ref_num):
+        response = self.cliente.table("cards_refacao").select(self.colunas).match(_filtro_chave(card_id, cont_num, ref_num)).execute()
+        return response.data[0] if response.data else None
+
+    def salvar_refacoes(self, linhas):
+        response = self.cliente.table("cards_refacao").upsert(
+            linhas,
+            on_conflict=ON_CONFLICT_REFACAO
+        ).execute()
+        return response.data or linhas
+
+    def salvar_refacoes_versionadas(self, linhas):
+        return self.cliente.rpc("salvar_refacoes", {"linhas": linhas}).execute().data
+
+    def excluir_refacao(self, card_id, cont_num, ref_num, versao=None):
+        filtro = _filtro_chave(card_id, cont_num, ref_num)
+        if versao is not None:
+            filtro["versao"] = versao
+        response = self.cliente.table("cards_refacao").delete().match(filtro).execute()
+        return versao is None or bool(response.data)
+
+    def excluir_refacoes(self, chaves):
+        for filtro in _filtros_chaves(chaves):
+            self.cliente.table("cards_refacao").delete(returning="minimal").or_(filtro).execute()
+
+    def excluir_refacoes_versionadas(self, chaves_versoes):
+        excluidas = 0
+        for filtro in _filtros_chaves(chaves_versoes):
+            excluidas += len(self.cliente.table("cards_refacao").delete().or_(filtro).execute().data)
+        return excluidas
+
+    def atualizar_refacoes(self, chaves, valores):
+        for filtro in _filtros_chaves(chaves):
+            self.cliente.table("cards_refacao").update(valores, returning="minimal").or_(filtro).execute()
+
+
+ESQUEMA_SQLITE = """
+create table if not exists cards (
+    trello_card_id text primary key,
+    titulo text not null unique
+);
+
+create table if not exists cards_refacao (
+    id_trello_card text not null,
+    titulo text,
+    numero_conteudo integer not null,
+    numero_refacao integer not null,
+    tipo_refacao text,
+    motivo_refacao text,
+    time_solicitou_refacao text,
+    cliente_solicitou_refacao text,
+    time_responsavel text,
+    versao integer not null default 1,
+    created_at text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    primary key (id_trello_card, numero_conteudo, numero_refacao)
+);
+"""
+
+COLUNAS_GRAVADAS = ("id_trello_card", "titulo") + CAMPOS_REFACAO
+_CAMPOS_ATUALIZADOS = tuple(c for c in COLUNAS_GRAVADAS if c not in CHAVE_REFACAO)
+_COLUNAS_SQLITE = ", ".join(COLUNAS_LIDAS + ("versao",))
+
+
+class RepositorioSQLite(Repositorio):
+    def __init__(self, caminho=":memory:"):
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.row_factory = sqlite3.Row
+        self._conexao.executescript(ESQUEMA_SQLITE)
+
+    def _consultar(self, sql, parametros=()):
+        with self._lock:
+            return [dict(linha) for linha in self._conexao.execute(sql, parametros)]
+
+    def inserir_cards(self, cards):
+        with self._lock, self._conexao:
+            self._conexao.executemany(
+                "insert or replace into cards (trello_card_id, titulo) values (:trello_card_id, :titulo)",
+                cards,
+            )
+
+    def indice_titulos(self):
+        return {item['titulo']: item['trello_card_id'] for item in self._consultar("select titulo, trello_card_id from cards")}
+
+    def buscar_titulos(self, termo, limite):
+        linhas = self._consultar(
+            "select titulo, trello_card_id from cards where titulo like ? escape '\\' order by titulo limit ?",
+            (_padrao_prefixo(termo), limite),
+        )
+        return {item['titulo']: item['trello_card_id'] for item in linhas}
+
+    def carregar_card(self, titulo):
+        with self._lock:
+            card = self._conexao.execute("select trello_card_id from cards where titulo = ?", (titulo,)).fetchone()
+            if card is None:
+                return None
+            linhas = self._conexao.execute(
+                f"select {_COLUNAS_SQLITE} from cards_refacao where id_trello_card = ?", (card["trello_card_id"],)
+            )
+            return card["trello_card_id"], [dict(linha) for linha in linhas]
+
+    def carregar_refacoes_cards(self, card_ids):
+        card_ids = list(card_ids)
+        return self._consultar(
+            f"select {_COLUNAS_SQLITE} from cards_refacao where id_trello_card in ({', '.join('?' * len(card_ids))}) "
+            "order by id_trello_card, numero_conteudo, numero_refacao",
+            card_ids,
+        )
+
+    def obter_refacao(self, card_id, cont_num, ref_num):
+        linhas = self._consultar(
+            f"select {_COLUNAS_SQLITE} from cards_refacao where id_trello_card = ? and numero_conteudo = ? and numero_refacao = ?",
+            (card_id, cont_num, ref_num),
+        )
+        return linhas[0] if linhas else None
+
+    def _selecionar_chaves(self, chaves):
+        return [
+            dict(self._conexao.execute(
+                "select * from cards_refacao where id_trello_card = ? and numero_conteudo = ? and numero_refacao = ?",
+                chave,
+            ).fetchone())
+            for chave in chaves
+        ]
+
+    def salvar_refacoes(self, linhas):
+        colunas = ", ".join(COLUNAS_GRAVADAS)
+        valores = ", ".join(f":{c}" for c in COLUNAS_GRAVADAS)
+        atualizacao = ", ".join(f"{c} = excluded.{c}" for c in _CAMPOS_ATUALIZADOS)
+        sql = (
+            f"insert into cards_refacao ({colunas}) values ({valores}) "
+            f"on conflict ({ON_CONFLICT_REFACAO}) do update set {atualizacao}, versao = versao + 1"
+        )
+        linhas = [{c: linha.get(c) for c in COLUNAS_GRAVADAS} for linha in linhas]
+        with self._lock, self._conexao:
+            self._conexao.executemany(sql, linhas)
+            return self._selecionar_chaves([tuple(linha[c] for c in CHAVE_REFACAO) for linha in linhas])
+
+    def salvar_refacoes_versionadas(self, linhas):
+        resultados = []
+        with self._lock, self._conexao:
+            for linha in linhas:
+                chave = tuple(linha[c] for c in CHAVE_REFACAO)
+                valores = {c: linha.get(c) for c in COLUNAS_GRAVADAS}
+                if linha.get("versao") is None:
+                    cursor = self._conexao.execute(
+                        f"insert into cards_refacao ({', '.join(COLUNAS_GRAVADAS)}) "
+                        f"values ({', '.join(':' + c for c in COLUNAS_GRAVADAS)}) on conflict do nothing",
+                        valores,
+                    )
+                else:
+                    atualizacao = ", ".join(f"{c} = :{c}" for c in _CAMPOS_ATUALIZADOS)
+                    cursor = self._conexao.execute(
+                        f"update cards_refacao set {atualizacao}, versao = versao + 1 "
+                        "where id_trello_card = :id_trello_card and numero_conteudo = :numero_conteudo "
+                        "and numero_refacao = :numero_refacao and versao = :versao",
+                        dict(valores, versao=linha["versao"]),
+                    )
+                registro = self._conexao.execute(
+                    "select * from cards_refacao where id_trello_card = ? and numero_conteudo = ? and numero_refacao = ?",
+                    chave,
+                ).fetchone()
+                resultados.append({
+                    "conteudo": chave[1],
+                    "refacao": chave[2],
+                    "status": "ok" if cursor.rowcount else "conflito",
+                    "registro": dict(registro) if registro else None,
+                })
+        return resultados
+
+    def excluir_refacao(self, card_id, cont_num, ref_num, versao=None):
+        sql = "delete from cards_refacao where id_trello_card = ? and numero_conteudo = ? and numero_refacao = ?"
+        parametros = (card_id, cont_num, ref_num)
+        if versao is not None:
+            sql += " and versao = ?"
+            parametros += (versao,)
+        with self._lock, self._conexao:
+            cursor = self._conexao.execute(sql, parametros)
+        return versao is None or cursor.rowcount > 0
+
+    def excluir_refacoes(self, chaves):
+        with self._lock, self._conexao:
+            self._conexao.executemany(
+                "delete from cards_refacao where id_trello_card = ? and numero_conteudo = ? and numero_refacao = ?",
+                chaves,
+            )
+
+    def excluir_refacoes_versionadas(self, chaves_versoes):
+        with self._lock, self._conexao:
+            cursor = self._conexao.executemany(
+                "delete from cards_refacao where id_trello_card = ? and numero_conteudo = ? and numero_refacao = ? and versao = ?",
+                chaves_versoes,
+            )
+        return cursor.rowcount
+
+    def atualizar_refacoes(self, chaves, valores):
+        atualizacao = ", ".join(f"{c} = :{c}" for c in valores)
+        with self._lock, self._conexao:
+            self._conexao.executemany(
+                f"update cards_refacao set {atualizacao}, versao = versao + 1 "
+                "where id_trello_card = :chave_card and numero_conteudo = :chave_conteudo and numero_refacao = :chave_refacao",
+                [dict(valores, chave_card=card_id, chave_conteudo=cont_num, chave_refacao=ref_num) for card_id, cont_num, ref_num in chaves],
+            )
+
+
+_repositorio = None
+_lock_repositorio = threading.Lock()
+
+
+def tipo_repositorio():
+    return configuracao("repositorio", "supabase")
+
+
+def _criar_repositorio():
+    tipo = tipo_repositorio()
+    if tipo == "sqlite":
+        return RepositorioSQLite(configuracao("sqlite_caminho", ":memory:"))
+    if tipo == "supabase":
+        return RepositorioSupabase(obter_cliente(), com_versao=configuracao_ativa("escrita_versionada"))
+    raise RuntimeError(f"Repositório desconhecido: {tipo}")
+
+
+def obter_repositorio():
+    global _repositorio
+    if _repositorio is None:
+        with _lock_repositorio:
+            if _repositorio is None:
+                _repositorio = _criar_repositorio()
+    return _repositorio
@@ -0,0 +1,89 @@
+import re
+import sys
+from collections import OrderedDict, deque
+
+import streamlit as st
+
+
+LIMITE_RASCUNHOS = 20
+PREFIXOS_REFACAO = ("tipo", "motivo", "time", "cliente", "placeholder")
+PREFIXOS_LINHA = PREFIXOS_REFACAO + ("CONFLITO_BANCO", "CONFLITO_MINHA", "DELETE_GLOBAL")
+
+
+def _padrao_card(card_id):
+    card = re.escape(card_id)
+    return re.compile(
+        rf"(?:(?:{'|'.join(PREFIXOS_LINHA)})-{card}-\d+-\d+|slider-conteudo-{card}|salvar-{card}|ADD_GLOBAL_{card}_\d+"
+        rf"|grade-{card}-\d+-\d+|pagina-grade-{card}|salvar-grade-{card})"
+    )
+
+
+def chaves_do_card(card_id):
+    padrao = _padrao_card(card_id)
+    return [chave for chave in st.session_state if isinstance(chave, str) and padrao.fullmatch(chave)]
+
+
+def linhas_com_widgets(card_id):
+    padrao = re.compile(rf"tipo-{re.escape(card_id)}-(\d+)-(\d+)")
+    linhas = []
+    for chave in st.session_state:
+        encontrado = isinstance(chave, str) and padrao.fullmatch(chave)
+        if encontrado:
+            linhas.append((int(encontrado.group(1)), int(encontrado.group(2))))
+    return sorted(linhas)
+
+
+def limpar_card(card_id):
+    for chave in chaves_do_card(card_id):
+        del st.session_state[chave]
+
+
+def _rascunhos():
+    if 'rascunhos' not in st.session_state:
+        st.session_state.rascunhos = OrderedDict()
+    return st.session_state.rascunhos
+
+
+def rascunho(card_id):
+    rascunhos = _rascunhos()
+    if card_id not in rascunhos:
+        return {}
+    rascunhos.move_to_end(card_id)
+    return rascunhos[card_id]
+
+
+def guardar_rascunho(card_id, refacoes):
+    rascunhos = _rascunhos()
+    if not refacoes:
+        rascunhos.pop(card_id, None)
+        return
+    rascunhos[card_id] = refacoes
+    rascunhos.move_to_end(card_id)
+    while len(rascunhos) > LIMITE_RASCUNHOS:
+        rascunhos.popitem(last=False)
+
+
+def _tamanho(objeto, vistos):
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    tamanho = sys.getsizeof(objeto)
+
+    if isinstance(objeto, dict):
+        tamanho += sum(_tamanho(k, vistos) + _tamanho(v, vistos) for k, v in objeto.items())
+    elif isinstance(objeto, (list, tuple, set, frozenset, deque)):
+        tamanho += sum(_tamanho(item, vistos) for item in objeto)
+    elif hasattr(objeto, "__dict__"):
+        tamanho += _tamanho(vars(objeto), vistos)
+    if hasattr(type(objeto), "__slots__"):
+        for nome in type(objeto).__slots__:
+            if hasattr(objeto, nome):
+                tamanho += _tamanho(getattr(objeto, nome), vistos)
+    return tamanho
+
+
+def memoria_sessao():
+    vistos = set()
+    chaves = list(st.session_state)
+    por_chave = {str(chave): _tamanho(st.session_state[chave], vistos) for chave in chaves}
+    return len(chaves), sum(por_chave.values()), por_chave
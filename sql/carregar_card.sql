@@ -0,0 +1,8 @@
+-- PostgREST only embeds cards_refacao in a cards select when the relationship is
+-- declared. "not valid" keeps the migration from failing on legacy orphan rows.
+alter table cards_refacao
+    add constraint cards_refacao_id_trello_card_fkey
+    foreign key (id_trello_card) references cards (trello_card_id)
+    not valid;
+
+create index if not exists cards_titulo_idx on cards (titulo);
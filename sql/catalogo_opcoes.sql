@@ -0,0 +1,12 @@
+create table if not exists catalogo_opcoes (
+    id bigint generated always as identity primary key,
+    categoria text not null check (categoria in ('tipo', 'time', 'cliente', 'motivo_criacao', 'motivo_redacao')),
+    valor text not null,
+    descricao text,
+    ordem integer not null default 0,
+    ativo boolean not null default true,
+    unique (categoria, valor)
+);
+
+create index if not exists catalogo_opcoes_categoria_ordem_idx
+    on catalogo_opcoes (categoria, ordem) where ativo;
@@ -0,0 +1,38 @@
+create index if not exists cards_refacao_created_at_idx
+    on cards_refacao (created_at);
+
+create or replace function resumo_refacoes(
+    dimensao text,
+    inicio timestamptz default null,
+    fim timestamptz default null,
+    granularidade text default 'month'
+)
+returns table (periodo timestamptz, valor text, total bigint)
+language plpgsql
+stable
+as $$
+begin
+    if dimensao not in (
+        'motivo_refacao', 'cliente_solicitou_refacao', 'time_solicitou_refacao',
+        'time_responsavel', 'tipo_refacao'
+    ) then
+        raise exception 'dimensao invalida: %', dimensao;
+    end if;
+
+    if granularidade not in ('day', 'week', 'month') then
+        raise exception 'granularidade invalida: %', granularidade;
+    end if;
+
+    return query execute format(
+        'select date_trunc(%L, created_at) as periodo,
+                coalesce(nullif(trim(%I), ''''), ''(vazio)'') as valor,
+                count(*) as total
+           from cards_refacao
+          where ($1 is null or created_at >= $1)
+            and ($2 is null or created_at < $2)
+          group by 1, 2
+          order by 1, 2',
+        granularidade, dimensao
+    ) using inicio, fim;
+end;
+$$;
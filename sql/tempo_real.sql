@@ -0,0 +1,5 @@
+-- DELETE events only carry the primary key unless the full old row is replicated;
+-- the app needs id_trello_card/numero_conteudo/numero_refacao to route them.
+alter table cards_refacao replica identity full;
+
+alter publication supabase_realtime add table cards_refacao;
@@ -0,0 +1,81 @@
+alter table cards_refacao add column if not exists versao integer not null default 1;
+
+create or replace function incrementar_versao_refacao()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.versao := old.versao + 1;
+    return new;
+end;
+$$;
+
+drop trigger if exists cards_refacao_versao on cards_refacao;
+create trigger cards_refacao_versao
+    before update on cards_refacao
+    for each row execute function incrementar_versao_refacao();
+
+-- Grava um lote de refações de forma condicional: linhas sem versao só são inseridas
+-- se a chave ainda não existir, e linhas com versao só são atualizadas se a versão
+-- no banco for a mesma. Cada linha volta com status 'ok' ou 'conflito' e o registro
+-- atual do banco (null se a refação tiver sido excluída).
+create or replace function salvar_refacoes(linhas jsonb)
+returns table (conteudo integer, refacao integer, status text, registro jsonb)
+language plpgsql
+as $$
+declare
+    linha jsonb;
+    salvo cards_refacao;
+    gravado boolean;
+    atual jsonb;
+begin
+    for linha in select value from jsonb_array_elements(linhas) loop
+        if linha->>'versao' is null then
+            insert into cards_refacao as c (
+                id_trello_card, titulo, numero_conteudo, numero_refacao, tipo_refacao,
+                motivo_refacao, time_solicitou_refacao, cliente_solicitou_refacao, time_responsavel
+            )
+            values (
+                linha->>'id_trello_card', linha->>'titulo',
+                (linha->>'numero_conteudo')::integer, (linha->>'numero_refacao')::integer,
+                linha->>'tipo_refacao', linha->>'motivo_refacao', linha->>'time_solicitou_refacao',
+                linha->>'cliente_solicitou_refacao', linha->>'time_responsavel'
+            )
+            on conflict (id_trello_card, numero_conteudo, numero_refacao) do nothing
+            returning c.* into salvo;
+            gravado := found;
+        else
+            update cards_refacao as c
+               set titulo = coalesce(linha->>'titulo', c.titulo),
+                   tipo_refacao = linha->>'tipo_refacao',
+                   motivo_refacao = linha->>'motivo_refacao',
+                   time_solicitou_refacao = linha->>'time_solicitou_refacao',
+                   cliente_solicitou_refacao = linha->>'cliente_solicitou_refacao',
+                   time_responsavel = linha->>'time_responsavel'
+             where c.id_trello_card = linha->>'id_trello_card'
+               and c.numero_conteudo = (linha->>'numero_conteudo')::integer
+               and c.numero_refacao = (linha->>'numero_refacao')::integer
+               and c.versao = (linha->>'versao')::integer
+            returning c.* into salvo;
+            gravado := found;
+        end if;
+
+        if gravado then
+            return query select salvo.numero_conteudo, salvo.numero_refacao, 'ok'::text, to_jsonb(salvo);
+        else
+            select c.* into salvo
+              from cards_refacao c
+             where c.id_trello_card = linha->>'id_trello_card'
+               and c.numero_conteudo = (linha->>'numero_conteudo')::integer
+               and c.numero_refacao = (linha->>'numero_refacao')::integer;
+            atual := case when found then to_jsonb(salvo) end;
+
+            return query select
+                (linha->>'numero_conteudo')::integer,
+                (linha->>'numero_refacao')::integer,
+                'conflito'::text,
+                atual;
+        end if;
+    end loop;
+end;
+$$;
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import weakref
+from collections import deque
+
+from conexao import configuracao, configuracao_ativa
+
+
+TABELA = "cards_refacao"
+ESPERA_RECONEXAO = 5
+ESPERA_MAXIMA_RECONEXAO = 300
+
+CONECTANDO = "conectando"
+CONECTADO = "conectado"
+INDISPONIVEL = "indisponível"
+
+logger = logging.getLogger("refacao.tempo_real")
+
+
+class Assinatura:
+    __slots__ = ("card_id", "eventos", "__weakref__")
+
+    def __init__(self, card_id):
+        self.card_id = card_id
+        self.eventos = deque()
+
+    def pendentes(self):
+        eventos = []
+        while self.eventos:
+            eventos.append(self.eventos.popleft())
+        return eventos
+
+
+class _Monitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assinantes = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="tempo-real", daemon=True)
+        self._thread.start()
+
+        from realtime import AsyncRealtimeClient
+
+        url = configuracao("url")
+        self._cliente = AsyncRealtimeClient(f"{url}/realtime/v1", token=configuracao("key"))
+        self.estado = CONECTANDO
+        self._conexao = asyncio.run_coroutine_threadsafe(self._conectar(), self._loop)
+
+    async def _conectar(self):
+        espera = ESPERA_RECONEXAO
+        while True:
+            try:
+                await self._assinar_tabela()
+            except Exception:
+                logger.exception("Falha ao assinar %s; nova tentativa em %d s", TABELA, espera)
+                self.estado = INDISPONIVEL
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, ESPERA_MAXIMA_RECONEXAO)
+            else:
+                self.estado = CONECTADO
+                return
+
+    async def _assinar_tabela(self):
+        canal = self._cliente.channel(TABELA)
+        canal.on_postgres_changes("*", self._distribuir, schema="public", table=TABELA)
+        await canal.subscribe()
+
+    def _distribuir(self, payload):
+        dados = payload["data"]
+        registro = dados.get("record") or {}
+        anterior = dados.get("old_record") or {}
+        card_id = registro.get("id_trello_card") or anterior.get("id_trello_card")
+
+        with self._lock:
+            assinantes = list(self._assinantes.get(card_id, ()))
+        evento = (dados["type"], registro, anterior)
+        for assinatura in assinantes:
+            assinatura.eventos.append(evento)
+
+    def assinar(self, card_id):
+        assinatura = Assinatura(card_id)
+        with self._lock:
+            self._assinantes.setdefault(card_id, weakref.WeakSet()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinantes = self._assinantes.get(assinatura.card_id)
+            if assinantes is not None:
+                assinantes.discard(assinatura)
+                if not assinantes:
+                    del self._assinantes[assinatura.card_id]
+
+
+_monitor = None
+_lock_monitor = threading.Lock()
+
+
+def habilitado():
+    return configuracao("repositorio", "supabase") == "supabase" and configuracao_ativa("tempo_real", True)
+
+
+def obter_monitor():
+    global _monitor
+    if _monitor is None:
+        with _lock_monitor:
+            if _monitor is None:
+                _monitor = _Monitor()
+    return _monitor
+
+
+def assinar(card_id):
+    if not habilitado():
+        return None
+    return obter_monitor().assinar(card_id)
+
+
+def cancelar(assinatura):
+    if assinatura is not None and _monitor is not None:
+        _monitor.cancelar(assinatura)
+
+
+def status():
+    return _monitor.estado if _monitor is not None else None
+
+
+def disponivel():
+    return status() != INDISPONIVEL
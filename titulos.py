@@ -0,0 +1,23 @@
+import streamlit as st
+
+import metricas
+
+
+TTL_INDICE_TITULOS = 600
+TTL_BUSCA_TITULOS = 60
+LIMITE_BUSCA_TITULOS = 20
+
+
+@st.cache_resource(ttl=TTL_INDICE_TITULOS, show_spinner=False)
+def carregar_indice_titulos():
+    return metricas.repositorio().indice_titulos()
+
+
+@st.cache_data(ttl=TTL_BUSCA_TITULOS, show_spinner=False)
+def buscar_titulos(termo, limite=LIMITE_BUSCA_TITULOS):
+    return metricas.repositorio().buscar_titulos(termo, limite)
+
+
+def invalidar_titulos():
+    carregar_indice_titulos.clear()
+    buscar_titulos.clear()